@@ -1,24 +1,27 @@
 import streamlit as st
-import tempfile
-from ultralytics import YOLO
+from model_functions import load_model, locked_predict
 from frame_processing_functions import *
 import chess
 import chess.svg
 from chess_functions import *
+from display_functions import GameView, show_exports
 
 # Load YOLO model
-model = YOLO(weight_path)
+model = load_model(weight_path)
 
 st.set_page_config(page_title="Image Chess Game Detection", page_icon="♟️")
 
 # Initialize variables
-if 'board' not in st.session_state:
-    start_game()
-
-white_moves = st.session_state.white_moves
-black_moves = st.session_state.black_moves
-
-st.session_state.conf_threshold = 0.7
+if 'tracker' not in st.session_state:
+    start_game(st.session_state)
+tracker = st.session_state.tracker
+
+# Photos are taken by hand, so the square classifier fast path isn't used here
+if 'image_detector' not in st.session_state:
+    st.session_state.image_detector = BoardDetector(
+        lambda frame, conf: locked_predict(model, frame, conf=conf), model.names, use_fast_path=False
+    )
+detector = st.session_state.image_detector
 
 # Streamlit Placeholders
 st.title("Chessgame history detection")
@@ -51,15 +54,15 @@ with summary_sec:
 white_sec, black_sec = st.columns(2)
 with white_sec:
     st.write("### White Player Moves")
-    white_moves_placeholder = st.dataframe(white_moves)
+    white_moves_placeholder = st.empty()
 with black_sec:
     st.write("### Black Player Moves")
-    black_moves_placeholder = st.dataframe(black_moves)
-
+    black_moves_placeholder = st.empty()
 
 reset_game_btn = st.button("Reset Game")
 if reset_game_btn:
-    start_game()
+    start_game(st.session_state)
+    st.rerun()
     
 prev_col, new_col = st.columns(2)
 with prev_col:
@@ -67,8 +70,17 @@ with prev_col:
 with new_col:
     new_status_placeholder = st.empty()
 
-# Display the Initial board
-board_svg_placeholder.markdown(update_board_display(st.session_state.board), unsafe_allow_html=True)
+# Everything the tracker does is shown through these placeholders
+view = GameView(
+    tracker, board_svg_placeholder, white_moves_placeholder, black_moves_placeholder,
+    prev_status_placeholder, new_status_placeholder, det_boxes_summary, detection_placeholder,
+    suggested_move, warning_placeholder, result_announcement,
+)
+
+# Evaluations that finished in the background since the last rerun are shown with the moves
+tracker.collect_evaluations()
+view.show_moves()
+view.show_board()
 
 if 'saved_boards' in st.session_state:
     select_board_text.write("Select from the following boards to start from it. This will restart your current game.")
@@ -84,148 +96,29 @@ if 'saved_boards' in st.session_state:
         )
 
         if selected_board_data and board_select_btn.button("Start From This"):
-            start_game(selected_board_data)
+            start_game(st.session_state, selected_board_data)
+            st.rerun()
 
 # Process the image to detect chess pieces
-def process_image(imagePath):
-
-    #start = time.time()
-    results = model.predict(source=imagePath, conf=st.session_state.conf_threshold)
-    #end = time.time()
-    #process = end - start
-    #print(f"Processing time: {process:} seconds")
-
-
-    boxes_no = len(results[0].boxes.xyxy)
-
-    # Ensuring that only 64 boxes are detected
-    if not results or boxes_no == 0:
-        warning_placeholder.warning(f'No results!')
-        return 
-    elif boxes_no > 64:
-            if st.session_state.conf_threshold < 0.9:
-                st.session_state.conf_threshold += 0.05
-            det_boxes_summary.write(f'number of detected boxes {boxes_no}, while expected is 64. new confidence = {st.session_state.conf_threshold}')
-            return
-    elif boxes_no < 64:
-        if st.session_state.conf_threshold > 0.5:
-            st.session_state.conf_threshold -= 0.05
-        det_boxes_summary.write(f'number of detected boxes {boxes_no}, while expected is 64. new confidence = {st.session_state.conf_threshold}')
-        return
-    
+def process_image(image):
+    new_board_status, info = detector.detect(image, tracker.previous_board_status)
+
     # Display the detection
-    det_boxes_summary.write(f"Detected boxes: {boxes_no} | Missing cells: {64 - boxes_no}")
-    detection_placeholder.image(results[0].plot(), channels="BGR", use_container_width=True)
+    view.show_detection(info)
 
-    # Get New board status [white, black, empty]
-    boxes = results[0].boxes.xyxy.cpu().numpy()
-    predicted_classes = results[0].boxes.cls
-    class_names = model.names
-    predicted_class_names = [class_names[int(cls_idx)] for cls_idx in predicted_classes]    
+    if new_board_status is not None:
+        view.render_events(tracker.feed(new_board_status, confidences=info['confidences']))
 
-    new_board_status = order_detections(boxes, predicted_class_names)
-    
-    # Display Board status if there are issues
-    prev_status_placeholder.pyplot(display_board_status(st.session_state.previous_board_status))
-    new_status_placeholder.pyplot(display_board_status(new_board_status))
-
-    # Get the move using status changes
-    move = detect_move(st.session_state.previous_board_status, new_board_status, st.session_state.board)
-
-    # For Move Suggestion Feature
-    is_suggested = move.get('is_suggested', False)
-    move_warning = move.get('warning', '')
-    if move_warning:
-        suggested_move.write(move_warning)
-        return
-
-    # For Move Suggestion Feature
-    if is_suggested:
-        start_square = move['start']  # e.g., 'e2'
-        end_squares = move['suggested_moves']  # e.g., ['e1', 'e2']
-
-        # Check if there are no legal moves
-        if not end_squares:
-            suggested_move.warning('No moves available')
-            return
-
-        suggested_move.write(f"The available moves for the {move['piece']} are:")
-        squares_to_highlight = [chess.parse_square(sq) for sq in end_squares]
-        svg_board = chess.svg.board(
-            st.session_state.board,
-            squares=squares_to_highlight,
-            fill=dict.fromkeys(squares_to_highlight, "rgba(0, 255, 0, 0.5)"),
-        )
-        board_svg_placeholder.markdown(svg_board, unsafe_allow_html=True)
-        return
-
-    # Remove suggestions
-    suggested_move.empty()
-    board_svg_placeholder.markdown(update_board_display(st.session_state.board), unsafe_allow_html=True)
-
-    # Validate the move
-    if 'start' in move and 'end' in move:
-        start_square = move['start']
-        end_square = move['end']
-        piece_name = move['piece']
-        eliminated_piece = move.get('eliminated', '')
-        castle = move.get('castle', '')
-
-        chess_move = chess.Move.from_uci(f"{start_square}{end_square}")
-        move_data = [piece_name, start_square, end_square, eliminated_piece, castle]
-
-        # Add move if legal else Display Errors
-        if chess_move in st.session_state.board.legal_moves:
-            warning_placeholder.empty()
-
-            
-            eval_before = evaluate_position(st.session_state.board)
-            st.session_state.board.push(chess_move)
-            eval_after = evaluate_position(st.session_state.board)
-
-            move_data.append(get_move_evaluation(eval_before, eval_after))
-
-            board_svg_placeholder.markdown(update_board_display(st.session_state.board), unsafe_allow_html=True)
-            
-            st.session_state.previous_board_status = map_board_to_board_status(st.session_state.board)
-
-            # update moves table
-            # Since move is pushed the turn will be for black and previous move was for the white so we add not
-            if not st.session_state.board.turn: 
-                white_moves.loc[len(white_moves)] = move_data
-            else:
-                black_moves.loc[len(black_moves)] = move_data
-
-            white_moves_placeholder.dataframe(white_moves)
-            black_moves_placeholder.dataframe(black_moves)
-
-            # Check win and display message
-            status, message = check_win_condition(st.session_state.board)
-            if status == "success":
-                result_announcement.success(message)
-            elif status == "warning":
-                result_announcement.warning(message)
-        else:
-            reason = explain_illegal_move(st.session_state.board, chess_move)
-            warning_placeholder.warning(f"Move {chess_move} is an illegal move: {reason}")
-
-# Upload and process image
+# Upload and process image, decoded in memory without a temporary file
 uploaded_file = st.file_uploader("Upload a chess image", type=["jpg", "jpeg", "png", "bmp"])
 if uploaded_file:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_image:
-        temp_image.write(uploaded_file.read())
-        temp_image_path = temp_image.name
-
-        image_placeholder.image(temp_image_path, caption="Uploaded Image", use_container_width=True)
-
-        process_image(temp_image_path)
-
-# Button to export to PDF
-if st.button("Export Move Tables to PDF"):
-    pdf = export_to_pdf(white_moves, black_moves)
-    st.download_button(
-        label="Download Move History as PDF",
-        data=pdf,
-        file_name="chess_move_history.pdf",
-        mime="application/pdf"
-    )
+    image = decode_image(uploaded_file.getbuffer())
+    if image is None:
+        warning_placeholder.warning("Unable to read the uploaded image.")
+    else:
+        image_placeholder.image(image, channels="BGR", caption="Uploaded Image", use_container_width=True)
+
+        process_image(image)
+
+# Export buttons, the files are made when a button is clicked
+show_exports(tracker)
@@ -1,6 +1,5 @@
 import streamlit as st
-import tempfile
-from ultralytics import YOLO
+from model_functions import load_model, locked_predict
 import chess
 import chess.svg
 from frame_processing_functions import *
@@ -11,13 +10,10 @@ from chess_functions import *
 st.set_page_config(page_title="Mid Chess Game Detection", page_icon="♟️")
 
 # Load YOLO model
-model = YOLO(weight_path)
-
-INITIAL_BOARD = chess.Board()
+model = load_model(weight_path)
 
 # Initialize session state
 def initialize_session_state():
-    st.session_state.conf_threshold = 0.9
     if 'imported_board' not in st.session_state:
         st.session_state.imported_board = chess.Board()
         st.session_state.previous_board_status = map_board_to_board_status(st.session_state.imported_board)
@@ -49,53 +45,48 @@ with col22:
 if 'imported_board' in st.session_state:
     board_svg_placeholder.markdown(update_board_display(st.session_state.imported_board), unsafe_allow_html=True)
     st.session_state.previous_board_status = map_board_to_board_status(st.session_state.imported_board)
-    board_status_placeholder.pyplot(display_board_status(st.session_state.previous_board_status))
+    board_status_placeholder.image(display_board_status(st.session_state.previous_board_status))
 
 if 'detection_vis' in st.session_state:
     det_out.image(st.session_state.detection_vis, channels="BGR", use_container_width=True)
 
 # Helper function to process uploaded image
-def process_image(image_path):
-    results = model.predict(source=image_path, conf=st.session_state.conf_threshold)
+def process_image(image):
+    # One inference at a low threshold, then the 64 most confident boxes that don't overlap are used
+    results = locked_predict(model, image, conf=conf_floor)
     if results:
         boxes = results[0].boxes.xyxy.cpu().numpy()
+        board_boxes = select_board_boxes(boxes, results[0].boxes.conf.cpu().numpy())
         
-        st.session_state.detection_vis = results[0].plot()
+        st.session_state.detection_vis = results[0][board_boxes].plot()
         det_out.image(st.session_state.detection_vis, channels="BGR", use_container_width=True)
 
-        if(len(boxes) != 64):
-            warning.warning(f"Recapture the image there are {64 - len(boxes)} boxes missings.")
+        if(len(board_boxes) < 64):
+            warning.warning(f"Recapture the image there are {64 - len(board_boxes)} boxes missings.")
             return
         
-        predicted_classes = results[0].boxes.cls
-        class_names = model.names
-        predicted_class_names = [class_names[int(cls)] for cls in predicted_classes]
+        predicted_classes = results[0].boxes.cls.cpu().numpy()
+        predicted_codes = get_status_codes(predicted_classes, model.names)
         
-        st.session_state.previous_board_status = order_detections(boxes, predicted_class_names)
-        board_status_placeholder.pyplot(display_board_status(st.session_state.previous_board_status))
+        st.session_state.previous_board_status = order_detections(boxes[board_boxes], predicted_codes[board_boxes])
+        board_status_placeholder.image(display_board_status(st.session_state.previous_board_status))
         st.session_state.imported_board = update_board_and_extract_pieces(st.session_state.previous_board_status)
         st.session_state.image_processed = True
         board_svg_placeholder.markdown(update_board_display(st.session_state.imported_board), unsafe_allow_html=True)
 
 # Helper function to update board and extract pieces positions
 def update_board_and_extract_pieces(board_status):
-    board = chess.Board(None)
+    board = status_to_board(board_status)
     st.session_state.black_positions.clear()
     st.session_state.white_positions.clear()
 
     for row in range(8):
         for col in range(8):
-            piece_color = board_status[row][col]
-            if piece_color != 'empty':
-                square = chess.square(col, 7 - row)
-                initial_piece_sympol = INITIAL_BOARD.piece_at(square)
-                piece = initial_piece_sympol if initial_piece_sympol else chess.Piece.from_symbol('P') if piece_color == 'white' else chess.Piece.from_symbol('p')
-                board.set_piece_at(square, piece)
-                
-                if piece.color == chess.BLACK:
-                    st.session_state.black_positions.append(to_chess_notation(row, col))
-                elif piece.color == chess.WHITE:
-                    st.session_state.white_positions.append(to_chess_notation(row, col))
+            piece = board.piece_at(chess.square(col, 7 - row))
+            if piece and piece.color == chess.BLACK:
+                st.session_state.black_positions.append(to_chess_notation(row, col))
+            elif piece and piece.color == chess.WHITE:
+                st.session_state.white_positions.append(to_chess_notation(row, col))
     return board
 
 # Helper function to convert row/column to chess notation
@@ -137,15 +128,16 @@ def save_board():
     st.session_state.image_processed = False
 
 
-# Upload and process image
+# Upload and process image, decoded in memory without a temporary file
 uploaded_file = st.file_uploader("Upload a chess image", type=["jpg", "jpeg", "png", "bmp"])
 if uploaded_file:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_image:
-        temp_image.write(uploaded_file.read())
-        temp_image_path = temp_image.name
-        image_out.image(temp_image_path, caption="Uploaded Image", use_container_width=True)
+    image = decode_image(uploaded_file.getbuffer())
+    if image is None:
+        warning.warning("Unable to read the uploaded image.")
+    else:
+        image_out.image(image, channels="BGR", caption="Uploaded Image", use_container_width=True)
         if not st.session_state.image_processed:
-            process_image(temp_image_path)
+            process_image(image)
 
 # Define available pieces and map
 available_pieces = ["Knight", "Rook", "Bishop", "Queen", "King", "Pawn"]
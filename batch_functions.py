@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from frame_processing_functions import *
+from model_functions import export_model, get_worker_model, init_worker_model, locked_predict, resolve_backend
+
+image_extensions = ('.jpg', '.jpeg', '.png', '.bmp')
+batch_conf_threshold = conf_floor  # The 64 most confident boxes that don't overlap are used
+batch_chunk_size = 8  # Images sent to a worker at once
+cache_file_name = 'cache.json'
+
+
+def list_images(folder):
+    # Image files of the folder in natural order, so IMG_9.jpg comes before IMG_10.jpg
+    names = [name for name in os.listdir(folder) if name.lower().endswith(image_extensions)]
+    return sorted(names, key=lambda name: [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)])
+
+
+def get_content_hash(image_path, conf=batch_conf_threshold, path=weight_path):
+    # The same image bytes with the same weights and threshold always give the same detections
+    digest = hashlib.blake2b(digest_size=16)
+    with open(image_path, 'rb') as image_file:
+        for block in iter(lambda: image_file.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(f"{path}:{conf}".encode())
+    return digest.hexdigest()
+
+
+def detect_image(image_path, content_hash, overlay_dir, conf=batch_conf_threshold):
+    # Returns the record cached for one image: number of boxes, board status (None unless all 64 squares were found) and overlay path
+    frame = cv2.imread(image_path)
+    if frame is None:
+        return {'boxes': 0, 'status': None, 'overlay': None, 'error': 'Unable to read the image'}
+
+    model = get_worker_model()
+    results = locked_predict(model, frame, conf=conf, verbose=False)
+    boxes = results[0].boxes.xyxy.cpu().numpy()
+    board_boxes = select_board_boxes(boxes, results[0].boxes.conf.cpu().numpy())
+
+    overlay_path = os.path.join(overlay_dir, content_hash + '.jpg')
+    cv2.imwrite(overlay_path, results[0][board_boxes].plot())
+
+    board_status = None
+    if len(board_boxes) == 64:
+        predicted_codes = get_status_codes(results[0].boxes.cls.cpu().numpy(), model.names)
+        board_status = order_detections(boxes[board_boxes], predicted_codes[board_boxes]).tolist()
+    return {'boxes': len(board_boxes), 'status': board_status, 'overlay': overlay_path}
+
+
+def load_cache(output_dir):
+    cache_path = os.path.join(output_dir, cache_file_name)
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path) as cache_file:
+        return json.load(cache_file)
+
+
+def save_cache(output_dir, cache):
+    cache_path = os.path.join(output_dir, cache_file_name)
+    with open(cache_path + '.tmp', 'w') as cache_file:
+        json.dump(cache, cache_file)
+    os.replace(cache_path + '.tmp', cache_path)
+
+
+def detect_folder(folder, output_dir=None, workers=os.cpu_count(), conf=batch_conf_threshold, path=weight_path, device=None):
+    # Detects every image of the folder, returns [(image name, record)] in natural order.
+    # Records are cached by content hash in output_dir, so a re-run only detects new or changed images
+    output_dir = output_dir or os.path.join(folder, 'detections')
+    overlay_dir = os.path.join(output_dir, 'overlays')
+    os.makedirs(overlay_dir, exist_ok=True)
+
+    names = list_images(folder)
+    image_paths = [os.path.join(folder, name) for name in names]
+    hashes = [get_content_hash(image_path, conf, path) for image_path in image_paths]
+
+    cache = load_cache(output_dir)
+    todo = [(image_path, content_hash) for image_path, content_hash in zip(image_paths, hashes) if content_hash not in cache]
+    print(f"{len(names)} images, {len(names) - len(todo)} cached, {len(todo)} to detect")
+
+    if todo:
+        todo_paths, todo_hashes = zip(*todo)
+        arguments = (todo_paths, todo_hashes, [overlay_dir] * len(todo), [conf] * len(todo))
+        # The runtime is picked and exported once here, the workers only load it
+        backend = resolve_backend(path, device)
+        export_model(path, backend)
+        if workers <= 1 or len(todo) <= batch_chunk_size:
+            init_worker_model(path, device, backend)
+            records = list(map(detect_image, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_model, initargs=(path, device, backend)) as executor:
+                records = list(executor.map(detect_image, *arguments, chunksize=batch_chunk_size))
+        cache.update(zip(todo_hashes, records))
+        save_cache(output_dir, cache)
+
+    return [(name, cache[content_hash]) for name, content_hash in zip(names, hashes)]
@@ -0,0 +1,83 @@
+"""Times the board shown next to the camera feed, rendered on every frame against the cached renders.
+
+A random game is replayed as a stream of frames: every position is seen for several frames, and
+on some of them a lifted piece shows its destinations. The original page rendered the full board
+SVG on every frame, twice when a suggestion was cleared and a move was played on the same frame.
+Now renders are cached by FEN, orientation and highlighted squares, and the page only sends the
+HTML to the browser when it differs from what it already shows.
+
+Usage: python benchmarks/board_render_benchmark.py [--moves 80] [--frames 10]
+"""
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+
+import chess
+import chess.svg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from chess_functions import *
+
+
+# Original implementation, kept as the reference
+def legacy_board_display(board, highlighted=()):
+    board_svg = chess.svg.board(board=board, squares=highlighted, fill=dict.fromkeys(highlighted, highlight_fill))
+    encoded_svg = base64.b64encode(board_svg.encode('utf-8')).decode('utf-8')
+    return f'<img src="data:image/svg+xml;base64,{encoded_svg}" width="400"/>'
+
+
+def frame_stream(moves, frames, rng):
+    # (board, highlighted squares) shown on each frame, twice on the frame a move is played
+    board = chess.Board()
+    for _ in range(moves):
+        if board.is_game_over():
+            break
+        legal_moves = list(board.legal_moves)
+        lifted = rng.choice(legal_moves).from_square
+        highlighted = [legal_move.to_square for legal_move in legal_moves if legal_move.from_square == lifted]
+        for frame in range(frames):
+            yield board.copy(stack=False), highlighted if frame >= frames // 2 else []
+        yield board.copy(stack=False), []
+        board.push(rng.choice(legal_moves))
+        yield board.copy(stack=False), []
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--moves', type=int, default=80)
+    parser.add_argument('--frames', type=int, default=10, help="Frames each position is seen for")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stream = list(frame_stream(args.moves, args.frames, random.Random(args.seed)))
+
+    start = time.perf_counter()
+    sent = 0
+    for board, highlighted in stream:
+        legacy_board_display(board, highlighted)
+        sent += 1
+    legacy_time = time.perf_counter() - start
+    print(f"render every frame: {legacy_time / len(stream) * 1e6:.0f} us per frame, {sent} boards sent")
+
+    board_display_cache.clear()
+    start = time.perf_counter()
+    sent, shown = 0, None
+    for board, highlighted in stream:
+        board_html = update_board_display(board, highlighted)
+        if board_html != shown:
+            sent += 1
+            shown = board_html
+    cached_time = time.perf_counter() - start
+    print(f"     cached render: {cached_time / len(stream) * 1e6:.0f} us per frame, {sent} boards sent, "
+          f"{len(board_display_cache)} renders cached")
+
+    # The renders must be the same boards the original drew
+    for board, highlighted in stream[:50]:
+        assert update_board_display(board, highlighted) == legacy_board_display(board, highlighted)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Checks the NumPy board status functions against the original list-based versions and times both.
+
+Usage: python benchmarks/board_status_benchmark.py [--iterations 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frame_processing_functions import *
+
+status_names = {code: name for name, code in status_codes.items()}
+
+
+# Original implementations, kept as the reference
+def legacy_map_board_to_board_status(board):
+    board_status = [['empty' for _ in range(8)] for _ in range(8)]
+    for row in range(8):
+        for col in range(8):
+            piece = board.piece_at(chess.square(col, 7 - row))
+            if piece:
+                board_status[row][col] = 'white' if piece.color else 'black'
+    return board_status
+
+def legacy_order_detections(boxes, classes):
+    detections = []
+    for index, box in enumerate(boxes):
+        detections.append({'x_center': (box[0] + box[2]) / 2, 'y_center': (box[1] + box[3]) / 2, 'class': classes[index]})
+    detections = sorted(detections, key=lambda d: d['y_center'])
+    rows = [detections[i * 8:(i + 1) * 8] for i in range(8)]
+    return [[cell['class'] for cell in sorted(row, key=lambda d: d['x_center'])] for row in rows]
+
+def legacy_status_changes(previous_board_status, new_board_status):
+    changes = []
+    for row in range(8):
+        for col in range(8):
+            previous, new = previous_board_status[row][col], new_board_status[row][col]
+            if previous != new:
+                square = chess.square(col, 7 - row)
+                if new == 'empty' and previous != 'empty':
+                    changes.append((square, START))
+                elif previous == 'empty' and new != 'empty':
+                    changes.append((square, END))
+                else:
+                    changes.append((square, CAPTURE))
+    return changes
+
+
+def to_names(board_status):
+    return [[status_names[int(code)] for code in row] for row in board_status]
+
+def random_board(rng):
+    board = chess.Board()
+    for _ in range(rng.randrange(0, 80)):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+    return board
+
+def random_detections(rng):
+    # A slightly rotated and jittered 8x8 grid of boxes in random order
+    angle = rng.uniform(-0.05, 0.05)
+    boxes, classes = [], []
+    for row in range(8):
+        for col in range(8):
+            x = 100 + col * 60 - row * 60 * angle + rng.uniform(-4, 4)
+            y = 80 + row * 60 + col * 60 * angle + rng.uniform(-4, 4)
+            boxes.append([x - 28, y - 28, x + 28, y + 28])
+            classes.append(rng.choice([EMPTY, WHITE, BLACK]))
+    order = list(range(64))
+    rng.shuffle(order)
+    return np.array([boxes[i] for i in order], dtype=np.float32), np.array([classes[i] for i in order], dtype=np.uint8)
+
+
+def check_equivalence(rng, iterations):
+    for _ in range(iterations):
+        board = random_board(rng)
+        assert to_names(map_board_to_board_status(board)) == legacy_map_board_to_board_status(board)
+
+        boxes, classes = random_detections(rng)
+        class_names = [status_names[int(code)] for code in classes]
+        assert to_names(order_detections(boxes, classes)) == legacy_order_detections(boxes, class_names)
+
+        previous = map_board_to_board_status(board)
+        new = previous.copy()
+        for _ in range(rng.randrange(0, 5)):
+            new[rng.randrange(8), rng.randrange(8)] = rng.choice([EMPTY, WHITE, BLACK])
+        assert get_status_changes(previous, new) == legacy_status_changes(to_names(previous), to_names(new))
+
+def time_call(function, args, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(*args)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    check_equivalence(rng, args.iterations // 10)
+    print("NumPy versions match the original functions")
+
+    board = random_board(rng)
+    boxes, classes = random_detections(rng)
+    class_names = [status_names[int(code)] for code in classes]
+    previous = map_board_to_board_status(board)
+    new = previous.copy()
+    new[6, 4], new[4, 4] = EMPTY, WHITE
+
+    print(f"{'function':<28} {'original (us)':>14} {'numpy (us)':>11}")
+    rows = [
+        ('map_board_to_board_status', (legacy_map_board_to_board_status, (board,)), (map_board_to_board_status, (board,))),
+        ('order_detections', (legacy_order_detections, (boxes, class_names)), (order_detections, (boxes, classes))),
+        ('status changes', (legacy_status_changes, (to_names(previous), to_names(new))), (get_status_changes, (previous, new))),
+    ]
+    for name, legacy, vectorized in rows:
+        print(f"{name:<28} {time_call(*legacy, args.iterations):>14.1f} {time_call(*vectorized, args.iterations):>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Compares picking the board's 64 boxes from one low-threshold inference with the old threshold stepping.
+
+For every photo of a folder, the old way starts at 0.7 and moves the threshold by 0.05 after each
+call until exactly 64 boxes come back, giving up after 8 calls or outside [0.5, 0.9]. The new way
+calls the model once at conf_floor and keeps the 64 most confident boxes that don't overlap.
+Both board statuses are read with order_detections and compared when both methods succeed.
+
+Usage: python benchmarks/confidence_selection_benchmark.py ["training images/20 moves"] [--weights weights/bestV13.pt]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frame_processing_functions import *
+from model_functions import load_model
+
+image_extensions = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def stepping_status(model, frame, conf=0.7, max_calls=8):
+    # Returns (board status or None, model calls)
+    for calls in range(1, max_calls + 1):
+        results = model.predict(source=frame, conf=conf, verbose=False)
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        if len(boxes) == 64:
+            return order_detections(boxes, get_status_codes(results[0].boxes.cls.cpu().numpy(), model.names)), calls
+        if len(boxes) > 64 and conf < 0.9:
+            conf += 0.05
+        elif len(boxes) < 64 and conf > 0.5:
+            conf -= 0.05
+        else:
+            break
+    return None, calls
+
+def floor_status(model, frame):
+    results = model.predict(source=frame, conf=conf_floor, verbose=False)
+    boxes = results[0].boxes.xyxy.cpu().numpy()
+    board_boxes = select_board_boxes(boxes, results[0].boxes.conf.cpu().numpy())
+    if len(board_boxes) < 64:
+        return None, 1
+    codes = get_status_codes(results[0].boxes.cls.cpu().numpy(), model.names)
+    return order_detections(boxes[board_boxes], codes[board_boxes]), 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('folder', nargs='?', default='training images/20 moves')
+    parser.add_argument('--weights', default=weight_path)
+    args = parser.parse_args()
+
+    model = load_model(args.weights)
+    paths = sorted(path for path in glob.glob(os.path.join(args.folder, '*')) if path.lower().endswith(image_extensions))
+
+    totals = {'stepping': [0, 0, 0.0], 'floor': [0, 0, 0.0]}  # boards found, model calls, seconds
+    agreements = []
+    for path in paths:
+        frame = cv2.imread(path)
+        statuses = {}
+        for name, method in [('stepping', lambda: stepping_status(model, frame)), ('floor', lambda: floor_status(model, frame))]:
+            start = time.perf_counter()
+            statuses[name], calls = method()
+            totals[name][0] += statuses[name] is not None
+            totals[name][1] += calls
+            totals[name][2] += time.perf_counter() - start
+
+        if statuses['stepping'] is not None and statuses['floor'] is not None:
+            agreements.append((statuses['stepping'] == statuses['floor']).mean())
+
+    for name, (found, calls, elapsed) in totals.items():
+        print(f"{name:>9}: board found in {found}/{len(paths)} photos, {calls / len(paths):.2f} model calls "
+              f"and {elapsed / len(paths) * 1000:.1f} ms per photo")
+    if agreements:
+        print(f"Squares that agree where both found the board: {np.mean(agreements):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Time per evaluated move when replaying the full move list vs. using an EngineSession.
+
+Usage: python benchmarks/engine_session_benchmark.py --stockfish <path to stockfish> [--depth 12]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+from stockfish import Stockfish
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from engine_functions import EngineSession
+
+plies = [10, 40, 100]
+moves_per_ply = 5  # Consecutive moves timed around each ply
+
+
+def random_game(length, seed=0):
+    # Random legal moves, retrying with another seed if the game ends too early
+    while True:
+        rng = random.Random(seed)
+        board = chess.Board()
+        while len(board.move_stack) < length and not board.is_game_over():
+            board.push(rng.choice(list(board.legal_moves)))
+        if len(board.move_stack) == length:
+            return board
+        seed += 1
+
+
+def time_full_replay(engine, game, end_ply):
+    moves = [move.uci() for move in game.move_stack]
+    start = time.perf_counter()
+    for ply in range(end_ply - moves_per_ply, end_ply):
+        engine.set_position(moves[:ply + 1])
+        engine.get_evaluation()
+    return (time.perf_counter() - start) / moves_per_ply
+
+
+def time_session(engine, game, end_ply):
+    session = EngineSession(engine)
+    board = chess.Board()
+    for move in game.move_stack[:end_ply - moves_per_ply]:
+        board.push(move)
+
+    start = time.perf_counter()
+    for move in game.move_stack[end_ply - moves_per_ply:end_ply]:
+        board.push(move)
+        session.set_position(board, game_id='benchmark')
+        engine.get_evaluation()
+    return (time.perf_counter() - start) / moves_per_ply
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stockfish', default='stockfish/stockfish-windows-x86-64-avx2.exe')
+    parser.add_argument('--depth', type=int, default=12)
+    args = parser.parse_args()
+
+    game = random_game(max(plies))
+    print(f"{'ply':>5} {'full replay (ms)':>18} {'session (ms)':>14}")
+    for ply in plies:
+        replay = time_full_replay(Stockfish(args.stockfish, depth=args.depth), game, ply)
+        session = time_session(Stockfish(args.stockfish, depth=args.depth), game, ply)
+        print(f"{ply:>5} {replay * 1000:>18.1f} {session * 1000:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Times exporting a long game to PDF, with and without board diagrams, and to PGN and JSON.
+
+A random game of --plies moves is recorded into a MoveLog the way GameTracker does it. The
+original export drew both tables with iterrows at a decreasing y on a single page, so past
+about 35 moves per side the rows ran off the page; it is timed on the same DataFrames as the
+reference. The new PDF is paginated, and the PGN is checked to replay to the same position.
+
+Usage: python benchmarks/export_benchmark.py [--plies 300] [--output export_benchmark]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+from io import BytesIO
+
+import chess
+import chess.pgn
+from reportlab.pdfgen import canvas
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from chess_functions import MoveLog, MoveRecord, describe_move
+from export_functions import export_to_json, export_to_pdf, export_to_pgn
+
+
+# Original implementation, kept as the reference
+def legacy_export_to_pdf(white_moves, black_moves):
+    pdf = BytesIO()
+    c = canvas.Canvas(pdf)
+    c.setFont("Helvetica", 16)
+    c.drawString(200, 800, "Chess Game Move History")
+    c.setFont("Helvetica", 14)
+    y = 760
+    for title, moves in [("White Player Moves:", white_moves), ("Black Player Moves:", black_moves)]:
+        c.drawString(100, y, title)
+        y -= 20
+        for index, row in moves.iterrows():
+            castle = f"Castle: {row['castle']}" if row['castle'] else ""
+            eliminated = f"Eliminated: {row['Eliminated']}" if row['Eliminated'] else ''
+            c.drawString(100, y, f"{str(row['Piece'])} from {row['From']} to {row['To']} {eliminated} {castle} Evaluation: {row['evaluation']}")
+            y -= 20
+        y -= 40
+    c.save()
+    pdf.seek(0)
+    return pdf
+
+
+def random_game(plies, rng):
+    # A move log of a random game that lasts at least `plies` moves, and its final board
+    while True:
+        board = chess.Board()
+        moves = MoveLog()
+        while len(moves) < plies and not board.is_game_over():
+            chess_move = rng.choice(list(board.legal_moves))
+            move = describe_move(board, chess_move)
+            moves.append(MoveRecord(board.turn, move['piece'], move['start'], move['end'], move.get('eliminated', ''),
+                                    move.get('castle', ''), move['uci'], rng.choice(["Best", "Good", "Mistake"])))
+            board.push(chess_move)
+        if len(moves) == plies:
+            return moves, board
+
+
+def count_pages(pdf_bytes):
+    return pdf_bytes.count(b'/Type /Page\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plies', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Folder to write the exported files to, for a look at them")
+    args = parser.parse_args()
+
+    moves, final_board = random_game(args.plies, random.Random(args.seed))
+    print(f"{len(moves)} plies")
+
+    exports = [
+        ('original PDF', lambda: legacy_export_to_pdf(moves.frame(chess.WHITE), moves.frame(chess.BLACK)).read()),
+        ('PDF', lambda: export_to_pdf(moves).read()),
+        ('PDF with diagrams', lambda: export_to_pdf(moves, diagrams=True).read()),
+        ('PGN', lambda: export_to_pgn(moves)),
+        ('JSON', lambda: export_to_json(moves)),
+    ]
+    outputs = {}
+    for name, export in exports:
+        start = time.perf_counter()
+        outputs[name] = export()
+        elapsed = time.perf_counter() - start
+        pages = f", {count_pages(outputs[name])} pages" if name.endswith(('PDF', 'diagrams')) else ""
+        print(f"{name:>17}: {elapsed * 1000:.0f} ms, {len(outputs[name]) / 1024:.0f} KB{pages}")
+
+    # PGN and JSON come from the same records and must lead to the same position
+    game = chess.pgn.read_game(io.StringIO(outputs['PGN']))
+    assert game.end().board().fen() == final_board.fen()
+    assert json.loads(outputs['JSON'])[-1]['fen'] == final_board.fen()
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for name, data in outputs.items():
+            extension = 'pgn' if name == 'PGN' else 'json' if name == 'JSON' else 'pdf'
+            mode = 'w' if isinstance(data, str) else 'wb'
+            with open(os.path.join(args.output, f"{name.replace(' ', '_')}.{extension}"), mode) as output_file:
+                output_file.write(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Compares the move log with the original DataFrame move tables over a long game.
+
+A game of --plies moves is recorded the way the pages did it: every move is appended to the
+white or black table and each of its evaluations arrives later, and every few moves the last
+move is taken back with Undo. After each change the tables are sent to the page, which
+serializes them to Arrow like st.dataframe. The original tables grew with `.loc` and both were
+sent on every change. The move log appends records and only builds and sends the table of the
+side whose moves changed.
+Both end with the same tables.
+
+Usage: python benchmarks/move_log_benchmark.py [--plies 300] [--undo-every 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import chess
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from chess_functions import MoveLog, MoveRecord, move_columns, pending_evaluation_label
+
+
+def game_moves(plies):
+    # (color, move data) of a game with knights going back and forth
+    squares = [('g1', 'f3'), ('g8', 'f6'), ('f3', 'g1'), ('f6', 'g8')]
+    return [(chess.WHITE if ply % 2 == 0 else chess.BLACK, ['knight', *squares[ply % 4], '', ''])
+            for ply in range(plies)]
+
+def send(white_table, black_table):
+    pa.Table.from_pandas(white_table)
+    pa.Table.from_pandas(black_table)
+
+
+def run_legacy(moves, undo_every):
+    tables = {chess.WHITE: pd.DataFrame(columns=move_columns), chess.BLACK: pd.DataFrame(columns=move_columns)}
+    for ply, (color, move_data) in enumerate(moves, 1):
+        table = tables[color]
+        table.loc[len(table)] = move_data + [pending_evaluation_label]
+        send(tables[chess.WHITE], tables[chess.BLACK])
+        table.loc[len(table) - 1, 'evaluation'] = "Best"
+        send(tables[chess.WHITE], tables[chess.BLACK])
+        if ply % undo_every == 0:
+            table.drop(table.tail(1).index, inplace=True)
+            send(tables[chess.WHITE], tables[chess.BLACK])
+            table.loc[len(table)] = move_data + ["Best"]
+            send(tables[chess.WHITE], tables[chess.BLACK])
+    return tables[chess.WHITE], tables[chess.BLACK]
+
+def run_move_log(moves, undo_every):
+    # Like show_moves, only the table whose moves changed is sent
+    log = MoveLog()
+    shown = {}
+    def show():
+        for color in (chess.WHITE, chess.BLACK):
+            if log.versions[color] != shown.get(color):
+                pa.Table.from_pandas(log.frame(color))
+                shown[color] = log.versions[color]
+
+    for ply, (color, move_data) in enumerate(moves, 1):
+        record = MoveRecord(color, *move_data)
+        log.append(record)
+        show()
+        log.set_evaluation(record, "Best")
+        show()
+        if ply % undo_every == 0:
+            log.pop()
+            show()
+            log.append(MoveRecord(color, *move_data, evaluation="Best"))
+            show()
+    return log.frame(chess.WHITE), log.frame(chess.BLACK)
+
+def run_move_log_only(moves, undo_every):
+    # The records alone, for the frames where no table is shown
+    log = MoveLog()
+    for ply, (color, move_data) in enumerate(moves, 1):
+        record = MoveRecord(color, *move_data)
+        log.append(record)
+        log.set_evaluation(record, "Best")
+        if ply % undo_every == 0:
+            log.pop()
+            log.append(MoveRecord(color, *move_data, evaluation="Best"))
+    return log.frame(chess.WHITE), log.frame(chess.BLACK)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plies', type=int, default=300)
+    parser.add_argument('--undo-every', type=int, default=10)
+    args = parser.parse_args()
+
+    moves = game_moves(args.plies)
+    results = {}
+    for name, run in [('DataFrame tables', run_legacy), ('move log', run_move_log), ('move log, tables at the end', run_move_log_only)]:
+        start = time.perf_counter()
+        results[name] = run(moves, args.undo_every)
+        print(f"{name:>27}: {(time.perf_counter() - start) / args.plies * 1000:.2f} ms per move")
+
+    legacy_white, legacy_black = results['DataFrame tables']
+    for white, black in results.values():
+        assert white.astype(str).equals(legacy_white.astype(str)) and black.astype(str).equals(legacy_black.astype(str))
+
+
+if __name__ == '__main__':
+    main()
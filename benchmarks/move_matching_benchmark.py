@@ -0,0 +1,132 @@
+"""Compares legal-move matching with the original guess-then-validate move detection.
+
+The second part times move suggestions for a lifted piece held over the board for several frames,
+against listing the legal moves and rendering the highlighted board on every frame as before.
+
+Random games are played and the board status after each move is given to both detectors, once
+clean and once with one extra misread square. A move counts as found if the detector returns
+exactly the move that was played, so underpromotions are always missed: on the board they look
+the same as a queen promotion. The original detector is the old detect_move followed by the
+`in board.legal_moves` check the pages did.
+
+Usage: python benchmarks/move_matching_benchmark.py [--games 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+import chess.svg
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from chess_functions import *
+
+
+# Original implementation, kept as the reference
+def legacy_detect_move(previous_board_status, new_board_status, board):
+    move = {}
+    for square, change in get_status_changes(previous_board_status, new_board_status):
+        square_name = chess.square_name(square)
+        if change == START:
+            move['start'] = square_name
+        else:
+            move['end'] = square_name
+    if 'start' not in move or 'end' not in move:
+        return None
+    chess_move = chess.Move.from_uci(f"{move['start']}{move['end']}")
+    return chess_move if chess_move in board.legal_moves else None
+
+def legacy_suggestion(board, start_square):
+    squares_to_highlight = [m.to_square for m in board.legal_moves if m.from_square == start_square]
+    return chess.svg.board(board, squares=squares_to_highlight, fill=dict.fromkeys(squares_to_highlight, "rgba(0, 255, 0, 0.5)"))
+
+def new_suggestion(board, start_square):
+    suggest_moves({'start': chess.square_name(start_square)}, board)
+    return get_suggestion_svg(board, chess.square_name(start_square))
+
+def new_detect_move(previous_board_status, new_board_status, board):
+    move = detect_move(previous_board_status, new_board_status, board)
+    return chess.Move.from_uci(move['uci']) if 'uci' in move else None
+
+
+def random_positions(games, rng):
+    # (board before, played move, status before, status after)
+    positions = []
+    for _ in range(games):
+        board = chess.Board()
+        while not board.is_game_over() and len(board.move_stack) < 200:
+            played = rng.choice(list(board.legal_moves))
+            before = map_board_to_board_status(board)
+            after_board = board.copy(stack=False)
+            after_board.push(played)
+            positions.append((board.copy(stack=False), played, before, map_board_to_board_status(after_board)))
+            board.push(played)
+    return positions
+
+def add_misread(board_status, rng):
+    # One square that didn't change is read as something else
+    misread = board_status.copy()
+    row, col = rng.randrange(8), rng.randrange(8)
+    misread[row, col] = (misread[row, col] + rng.randrange(1, 3)) % 3
+    return misread
+
+
+def run(detector, positions, statuses, repeats=1):
+    # Each status is detected `repeats` times in a row, like the same frame content seen several times
+    found = 0
+    elapsed = [0.0] * repeats
+    for (board, played, before, _), after in zip(positions, statuses):
+        for repeat in range(repeats):
+            start = time.perf_counter()
+            detected = detector(before, after, board)
+            elapsed[repeat] += time.perf_counter() - start
+        found += detected == played
+    return found, [total / len(positions) * 1e6 for total in elapsed]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    positions = random_positions(args.games, rng)
+    special = sum(board.is_castling(played) or board.is_en_passant(played) or bool(played.promotion)
+                  for board, played, _, _ in positions)
+    underpromotions = sum(played.promotion not in (None, chess.QUEEN) for _, played, _, _ in positions)
+    print(f"{len(positions)} moves, {special} castling, en passant or promotion, {underpromotions} underpromotions")
+
+    clean = [after for _, _, _, after in positions]
+    noisy = []
+    for board, played, before, after in positions:
+        misread = add_misread(after, rng)
+        # Keep only misreads of squares the move didn't touch
+        noisy.append(misread if (misread != after).sum() == 1 and ((misread != after) & (after == before)).any() else after)
+
+    for name, statuses in [('clean', clean), ('one misread square', noisy)]:
+        legacy_found, (legacy_time,) = run(legacy_detect_move, positions, statuses)
+        move_index_cache.clear()
+        found, (cold_time, warm_time) = run(new_detect_move, positions, statuses, repeats=2)
+        print(f"{name}:")
+        print(f"  guess then validate: {legacy_found}/{len(positions)} found, {legacy_time:.1f} us per move")
+        print(f"  legal move matching: {found}/{len(positions)} found, {cold_time:.1f} us per move "
+              f"with the index built, {warm_time:.1f} us with it cached")
+
+    # A piece of the side to move is lifted and held for `hover_frames` frames
+    hover_frames = 10
+    hovers = [(board, rng.choice([m.from_square for m in board.legal_moves])) for board, _, _, _ in rng.sample(positions, 200)]
+    move_index_cache.clear()
+    for name, suggestion in [('list and render every frame', legacy_suggestion), ('cached index and SVG', new_suggestion)]:
+        start = time.perf_counter()
+        for board, start_square in hovers:
+            for _ in range(hover_frames):
+                suggestion(board, start_square)
+        print(f"suggestions, {name}: {(time.perf_counter() - start) / len(hovers) / hover_frames * 1e6:.1f} us per frame")
+
+
+if __name__ == '__main__':
+    main()
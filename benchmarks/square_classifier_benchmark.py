@@ -0,0 +1,79 @@
+"""Compares the square classifier fast path with full YOLO detection on a folder of board photos.
+
+The YOLO board status of each photo is taken as the reference. The classifier is calibrated on the
+first photo with 64 board boxes and then run on every photo with that photo's fitted board grid.
+
+Usage: python benchmarks/square_classifier_benchmark.py ["training images/20 moves"] [--weights weights/bestV13.pt]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frame_processing_functions import *
+from model_functions import load_model, locked_predict
+
+image_extensions = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('folder', nargs='?', default='training images/20 moves')
+    parser.add_argument('--weights', default=weight_path)
+    parser.add_argument('--conf', type=float, default=conf_floor)
+    args = parser.parse_args()
+
+    model = load_model(args.weights)
+    classifier = SquareClassifier()
+    paths = sorted(path for path in glob.glob(os.path.join(args.folder, '*')) if path.lower().endswith(image_extensions))
+
+    yolo_times, classifier_times, accuracies, certain_accuracies = [], [], [], []
+    for path in paths:
+        frame = cv2.imread(path)
+
+        start = time.perf_counter()
+        # The same board boxes the app reads: one predict at conf_floor, the 64 most confident that don't overlap
+        results = locked_predict(model, frame, conf=args.conf, verbose=False)
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        board_boxes = select_board_boxes(boxes, results[0].boxes.conf.cpu().numpy())
+        if len(board_boxes) < 64:
+            print(f"{os.path.basename(path)}: skipped, {len(board_boxes)} boxes")
+            continue
+        codes = get_status_codes(results[0].boxes.cls.cpu().numpy(), model.names)
+        reference = order_detections(boxes[board_boxes], codes[board_boxes])
+        yolo_times.append(time.perf_counter() - start)
+
+        homography = fit_board_homography(boxes[board_boxes])
+        if homography is None:
+            continue
+        if not classifier.is_calibrated():
+            classifier.calibrate(frame, homography, reference)
+
+        start = time.perf_counter()
+        board_status, uncertain = classifier.classify(frame, homography)
+        classifier_times.append(time.perf_counter() - start)
+
+        accuracy = (board_status == reference).mean()
+        accuracies.append(accuracy)
+        if uncertain == 0:
+            certain_accuracies.append(accuracy)
+        print(f"{os.path.basename(path)}: accuracy {accuracy:.3f}, uncertain squares {uncertain}")
+
+    if not classifier_times:
+        print("No photo had 64 detected boxes")
+        return
+
+    print(f"\nYOLO:       {np.mean(yolo_times) * 1000:8.1f} ms per frame")
+    print(f"Classifier: {np.mean(classifier_times) * 1000:8.1f} ms per frame")
+    print(f"Square accuracy vs YOLO: {np.mean(accuracies):.3f}")
+    print(f"Frames the fast path would accept: {len(certain_accuracies)}/{len(accuracies)}"
+          + (f", accuracy {np.mean(certain_accuracies):.3f}" if certain_accuracies else ""))
+
+
+if __name__ == '__main__':
+    main()
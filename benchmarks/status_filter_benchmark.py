@@ -0,0 +1,83 @@
+"""Measures how many misread board statuses get past the status filter.
+
+A random game is replayed as a stream of detections. Each position is detected several times, and
+any detection may misread one random square. The stream goes through a StatusFilter for each
+window and min_votes setting, and through no filter as the baseline. A status that matches no
+position of the game counts as spurious: it is a status that would have reached the game and
+triggered a warning, a suggestion or a Stockfish evaluation.
+
+Usage: python benchmarks/status_filter_benchmark.py [--moves 60] [--detections 4] [--flicker 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frame_processing_functions import *
+
+
+def random_game(moves, rng):
+    board = chess.Board()
+    statuses = [map_board_to_board_status(board)]
+    while len(statuses) <= moves and not board.is_game_over():
+        board.push(rng.choice(list(board.legal_moves)))
+        statuses.append(map_board_to_board_status(board))
+    return statuses
+
+
+def detection_stream(statuses, detections, flicker, rng):
+    for board_status in statuses:
+        for _ in range(detections):
+            detected = board_status.copy()
+            if rng.random() < flicker:
+                detected[rng.randrange(8), rng.randrange(8)] = rng.randrange(3)
+            yield detected
+
+
+def run(statuses, stream, status_filter):
+    known = {board_status.tobytes() for board_status in statuses}
+    emitted, spurious, last = 0, 0, None
+    start = time.perf_counter()
+    for detected in stream:
+        if status_filter:
+            detected = status_filter.update(detected)
+        elif last is not None and np.array_equal(detected, last):
+            detected = None
+        if detected is None:
+            continue
+        last = detected
+        emitted += 1
+        spurious += detected.tobytes() not in known
+    return emitted, spurious, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--moves', type=int, default=60)
+    parser.add_argument('--detections', type=int, default=4, help="Detections of each position")
+    parser.add_argument('--flicker', type=float, default=0.2, help="Chance that a detection misreads a square")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    statuses = random_game(args.moves, rng)
+    stream = list(detection_stream(statuses, args.detections, args.flicker, rng))
+    print(f"{len(statuses)} positions, {len(stream)} detections, flicker {args.flicker}")
+
+    settings = [('no filter', None)] + [
+        (f"window {window}, min_votes {min_votes}", StatusFilter(window, min_votes))
+        for window, min_votes in [(3, 2), (5, 3), (5, 4)]
+    ]
+    for name, status_filter in settings:
+        emitted, spurious, elapsed = run(statuses, stream, status_filter)
+        print(f"{name:>24}: {emitted} statuses emitted, {spurious} spurious, "
+              f"{elapsed / len(stream) * 1e6:.1f} us per detection")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Times the board status images of the pages and checks that memory stays flat over a long session.
+
+A random game is replayed as a stream of frames, each position seen several times with the
+occasional misread square, and every frame shows the previous and new status like render_events.
+The original matplotlib figure, which was never closed, is timed on the first frames only. The
+cached image is timed over the whole stream, and the process RSS is sampled along the way: after
+the cache has filled up it should not grow any more.
+
+Usage: python benchmarks/status_image_benchmark.py [--frames 10000] [--legacy-frames 100]
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+import chess
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+plt.rcParams['figure.max_open_warning'] = 0  # The original never closed its figures
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from frame_processing_functions import *
+
+
+# Original implementation, kept as the reference
+def legacy_display_board_status(board_status):
+    status_colors = np.array([matplotlib.colors.to_rgba(color) for color in ('#DDDDDD', '#FFFFFF', '#000000')])
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.imshow(status_colors[np.asarray(board_status)], extent=[0, 8, 0, 8])
+    return fig
+
+
+def get_rss_mb():
+    # Current resident memory, from /proc where it exists, otherwise the peak
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def frame_stream(frames, rng, detections=5, flicker=0.1):
+    # (previous status, new status) shown on each frame
+    board = chess.Board()
+    previous = map_board_to_board_status(board)
+    count = 0
+    while count < frames:
+        if board.is_game_over():
+            board = chess.Board()
+        board.push(rng.choice(list(board.legal_moves)))
+        new = map_board_to_board_status(board)
+        for _ in range(detections):
+            detected = new.copy()
+            if rng.random() < flicker:
+                detected[rng.randrange(8), rng.randrange(8)] = rng.randrange(3)
+            yield previous, detected
+            count += 1
+            if count == frames:
+                return
+        previous = new
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=10000)
+    parser.add_argument('--legacy-frames', type=int, default=100, help="Frames drawn with the original matplotlib figure")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stream = list(frame_stream(args.frames, random.Random(args.seed)))
+
+    rss_before = get_rss_mb()
+    start = time.perf_counter()
+    for previous, new in stream[:args.legacy_frames]:
+        legacy_display_board_status(previous)
+        legacy_display_board_status(new)
+    legacy_time = time.perf_counter() - start
+    print(f"matplotlib figure: {legacy_time / args.legacy_frames * 1000:.1f} ms per frame, "
+          f"RSS grew {get_rss_mb() - rss_before:.0f} MB over {args.legacy_frames} frames")
+    plt.close('all')
+
+    rss_samples = []
+    start = time.perf_counter()
+    for frame, (previous, new) in enumerate(stream):
+        display_board_status(previous)
+        display_board_status(new)
+        if frame % (len(stream) // 10) == 0:
+            rss_samples.append(get_rss_mb())
+    cached_time = time.perf_counter() - start
+    rss_samples.append(get_rss_mb())
+    print(f"     cached image: {cached_time / len(stream) * 1e6:.1f} us per frame over {len(stream)} frames")
+    print(f"RSS (MB) every {len(stream) // 10} frames: {' '.join(f'{rss:.1f}' for rss in rss_samples)}")
+    print(f"RSS grew {rss_samples[-1] - rss_samples[1]:.1f} MB after the first {len(stream) // 10} frames")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+camera_source = 0
+target_inference_fps = 3  # Most frames per second sent to the detector
+motion_check_fps = 10  # How often frames are checked for changes on the board
+
+
+class FrameGrabber:
+    """Reads frames from a camera on a background thread and keeps only the newest ones.
+
+    Capture keeps running while the consumer is busy with detection, so the frame handed
+    to the detector is never older than one camera frame, however slow inference is.
+    """
+
+    def __init__(self, source=camera_source, buffer_size=1):
+        self.source = source
+        self.frames = deque(maxlen=buffer_size)  # Drop-oldest ring buffer
+        self.condition = threading.Condition()
+        self.capture = None
+        self.thread = None
+        self.running = False
+        self.frame_id = 0
+        self.last_read_id = 0
+        self.captured = 0
+        self.dropped = 0
+        self.failed_reads = 0
+
+    def start(self):
+        self.capture = cv2.VideoCapture(self.source)
+        if not self.capture.isOpened():
+            self.capture.release()
+            return False
+
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def _capture_loop(self):
+        while self.running:
+            ret, frame = self.capture.read()
+            if not ret:
+                self.failed_reads += 1
+                time.sleep(0.01)
+                continue
+
+            with self.condition:
+                # Count frames pushed out of the buffer before the consumer got to them
+                if len(self.frames) == self.frames.maxlen and self.frames[0][0] > self.last_read_id:
+                    self.dropped += 1
+                self.frame_id += 1
+                self.captured += 1
+                self.frames.append((self.frame_id, time.perf_counter(), frame))
+                self.condition.notify_all()
+
+    def read(self, timeout=1.0):
+        # Returns the newest frame that hasn't been read yet, or None if none arrived in time
+        with self.condition:
+            has_new_frame = self.condition.wait_for(
+                lambda: self.frames and self.frames[-1][0] > self.last_read_id, timeout=timeout
+            )
+            if not has_new_frame:
+                return None
+            frame_id, captured_at, frame = self.frames[-1]
+            self.last_read_id = frame_id
+            return frame
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        if self.capture:
+            self.capture.release()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'captured': self.captured,
+                'dropped': self.dropped,
+                'failed_reads': self.failed_reads,
+                'frame_age': time.perf_counter() - self.frames[-1][1] if self.frames else None,
+            }
+
+
+class MotionGate:
+    """Decides whether a frame is worth sending to the detector.
+
+    Frames are reduced to a 64x64 grayscale image of the board (warped top-down when the board
+    homography is known) and compared per square. Detection only runs once the board has been
+    still for `stable_frames` checks, so a hand over the board never reaches the detector, and
+    only if a square changed since the last detection or `refresh_interval` seconds passed.
+    A recheck detects an unchanged board again, at most `max_rechecks` times in a row (about the
+    StatusFilter window), so a square that keeps flickering doesn't keep an idle board busy.
+    """
+
+    def __init__(self, stable_frames=3, motion_threshold=6.0, change_threshold=10.0,
+                 min_interval=1 / target_inference_fps, refresh_interval=5.0, max_rechecks=3, scale=0.25):
+        self.stable_frames = stable_frames
+        self.motion_threshold = motion_threshold  # Mean gray level change per square between checks
+        self.change_threshold = change_threshold  # Mean gray level change per square since the last detection
+        self.min_interval = min_interval
+        self.refresh_interval = refresh_interval
+        self.max_rechecks = max_rechecks
+        self.scale = scale
+        self.previous_image = None
+        self.detected_image = None
+        self.last_detection = 0.0
+        self.stable_count = 0
+        self.rechecks = 0  # Detections in a row that only ran because of a recheck
+        self.checked = 0
+        self.skipped = 0
+
+    def _board_image(self, frame, homography):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if homography is None:
+            return cv2.resize(small, (64, 64), interpolation=cv2.INTER_AREA)
+
+        # Homography maps full size pixels to board units, scale it to small pixels in and 8 pixels per square out
+        to_board = np.diag([8.0, 8.0, 1.0]) @ homography @ np.diag([1 / self.scale, 1 / self.scale, 1.0])
+        return cv2.warpPerspective(small, to_board, (64, 64), flags=cv2.INTER_AREA)
+
+    @staticmethod
+    def square_energy(image, other):
+        # Mean absolute difference of each of the 64 squares
+        diff = cv2.absdiff(image, other).astype(np.float32)
+        return diff.reshape(8, 8, 8, 8).mean(axis=(1, 3))
+
+    def should_infer(self, frame, homography=None, force=False, recheck=False):
+        # force skips the stability and change checks, recheck only the change check. The rate limit always applies
+        self.checked += 1
+        image = self._board_image(frame, homography)
+        previous, self.previous_image = self.previous_image, image
+
+        if previous is None or self.square_energy(image, previous).max() > self.motion_threshold:
+            self.stable_count = 0
+        else:
+            self.stable_count += 1
+
+        now = time.perf_counter()
+        changed = (
+            self.detected_image is None
+            or self.square_energy(image, self.detected_image).max() > self.change_threshold
+            or now - self.last_detection > self.refresh_interval
+        )
+        # Rechecks run out until the board changes again
+        recheck = recheck and not changed and self.rechecks < self.max_rechecks
+        if now - self.last_detection < self.min_interval or (not force and (self.stable_count < self.stable_frames or not (changed or recheck))):
+            self.skipped += 1
+            return False
+
+        self.rechecks = self.rechecks + 1 if recheck and not force else 0
+        self.detected_image = image
+        self.last_detection = now
+        return True
+
+    def stats(self):
+        return {'checked': self.checked, 'skipped': self.skipped, 'stable_count': self.stable_count, 'rechecks': self.rechecks}
@@ -1,16 +1,35 @@
-import streamlit as st
 import chess
 import chess.svg
 import chess.engine
+import chess.polyglot
+import numpy as np
 import pandas as pd
 import base64
-from reportlab.pdfgen import canvas
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from frame_processing_functions import *
-from stockfish import Stockfish
+from engine_functions import EnginePool, engine_pool_size
 
 # Variables
 stockfish_path = "stockfish/stockfish-windows-x86-64-avx2.exe"
-stockfish = Stockfish(stockfish_path)
+engine_pool = EnginePool(stockfish_path, size=engine_pool_size)
+
+# Background Stockfish work, one worker per pooled engine
+engine_executor = ThreadPoolExecutor(max_workers=engine_pool_size, thread_name_prefix="stockfish")
+pending_evaluation_label = "Pending"
+
+# Engine results per position, shared by every session. The score after a move is the score
+# before the next one, so each accepted move only needs one new evaluation.
+# Key: (zobrist hash, search depth) -> {'score': int, 'best_move': str}
+position_cache = OrderedDict()
+position_cache_size = 4096
+position_cache_lock = threading.Lock()
+position_cache_stats = {'hits': 0, 'misses': 0}
+# Analyses still running, so a position requested twice at once is only searched once
+# Key: ((zobrist hash, search depth), field) -> Future
+position_pending = {}
 
 classification_thresholds = [
     (0.00, 0.00, "Best"),
@@ -21,106 +40,448 @@ classification_thresholds = [
     (0.20, 1.00, "Blunder"),
 ]
 
+# Legal moves of recently seen positions with the board status each one leads to, see get_move_index
+# Key: board transposition key -> {'previous', 'moves', 'expected', 'changes', 'by_signature', 'destinations'}
+# Pushing or popping a move changes the key, so entries never need to be invalidated
+move_index_cache = OrderedDict()
+move_index_cache_size = 256
+move_index_lock = threading.Lock()
+move_match_tolerance = 1  # Changed squares a matched move may leave unexplained
+
+# Rendered boards, shared by every session. A board is only rendered again when its pieces,
+# orientation or highlighted squares change, so repeated frames of one position reuse the HTML
+# Key: (board FEN, orientation, highlighted squares) -> <img> tag
+board_display_cache = OrderedDict()
+board_display_cache_size = 512
+board_display_lock = threading.Lock()
+highlight_fill = "rgba(0, 255, 0, 0.5)"
+
 piece_names = {
     'P': 'pawn', 'N': 'knight', 'B': 'bishop', 'R': 'rook', 'Q': 'queen', 'K': 'king',
     'p': 'pawn', 'n': 'knight', 'b': 'bishop', 'r': 'rook',    'q': 'queen', 'k': 'king',
 }
 
-def start_game(board:chess.Board = None):
-    if board:
-        st.session_state.board = board
-    else:
-        st.session_state.board = chess.Board()
-    st.session_state.previous_board_status = map_board_to_board_status(st.session_state.board)
-    st.session_state.white_moves = pd.DataFrame(columns=["Piece", "From", "To", "Eliminated", "castle", "evaluation"])
-    st.session_state.black_moves = pd.DataFrame(columns=["Piece", "From", "To", "Eliminated", "castle", "evaluation"])
+move_columns = ["Piece", "From", "To", "Eliminated", "castle", "evaluation"]
+
+
+class MoveRecord:
+    # One played move. Slots keep a long game to a few small objects instead of growing DataFrames
+    __slots__ = ('color', 'piece', 'start', 'end', 'eliminated', 'castle', 'uci', 'evaluation')
+
+    def __init__(self, color, piece, start, end, eliminated='', castle='', uci='', evaluation=pending_evaluation_label):
+        self.color = color
+        self.piece = piece
+        self.start = start
+        self.end = end
+        self.eliminated = eliminated
+        self.castle = castle
+        self.uci = uci
+        self.evaluation = evaluation
+
+    def row(self):
+        # The record as a row of the move tables, in move_columns order
+        return [self.piece, self.start, self.end, self.eliminated, self.castle, self.evaluation]
+
+
+class MoveLog:
+    """Moves of one game in play order, white and black together.
+
+    Appending and popping are O(1). The white and black move tables are DataFrames built only
+    when something shows or exports them, and rebuilt only after that side's moves changed.
+    versions go up on every change, so a page can skip redrawing tables it already shows.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.versions = {chess.WHITE: 0, chess.BLACK: 0}
+        self.frames = {}  # color -> (version, DataFrame)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def append(self, record):
+        self.records.append(record)
+        self.versions[record.color] += 1
+
+    def pop(self):
+        record = self.records.pop()
+        self.versions[record.color] += 1
+        return record
+
+    def set_evaluation(self, record, evaluation):
+        record.evaluation = evaluation
+        self.versions[record.color] += 1
+
+    def frame(self, color):
+        cached = self.frames.get(color)
+        if cached is None or cached[0] != self.versions[color]:
+            rows = [record.row() for record in self.records if record.color == color]
+            cached = self.frames[color] = (self.versions[color], pd.DataFrame(rows, columns=move_columns))
+        return cached[1]
+
+
+class GameTracker:
+    """Follows one game from the board statuses of successive frames, without any UI.
+
+    feed() returns a list of event dicts ('status', 'warning', 'suggestion', 'clear_suggestion',
+    'move', 'illegal', 'game_over') so a Streamlit page, a CLI or a video worker can each
+    decide how to show them. Played moves go into a MoveLog, their evaluations run in the
+    background and are filled in by collect_evaluations().
+    """
+
+    def __init__(self, board=None):
+        self.board = board.copy() if board else chess.Board()
+        self.start_board = self.board.copy(stack=False)  # Exports replay the move log from here
+        self.game_id = uuid.uuid4().hex  # Lets the engines keep their hash tables for this game only
+        self.previous_board_status = map_board_to_board_status(self.board)
+        self.moves = MoveLog()
+        self.pending_evaluations = {}  # ply -> (move record, future)
+
+    def feed(self, new_board_status, bot_color=None, confidences=None):
+        # On the bot's turn the move comes from Stockfish instead of the board status.
+        # confidences (8x8, optional) say how much each square of the status can be trusted
+        events = [{'type': 'status', 'previous': self.previous_board_status, 'new': new_board_status}]
+        if bot_color is not None and self.board.turn == bot_color:
+            move = get_full_move(self.board, self.game_id)
+        else:
+            move = detect_move(self.previous_board_status, new_board_status, self.board, confidences)
+
+        if move.get('warning'):
+            events.append({'type': 'warning', 'message': move['warning']})
+            return events
+
+        # For Move Suggestion Feature
+        if move.get('is_suggested', False):
+            events.append({'type': 'suggestion', 'start': move['start'], 'piece': move['piece'], 'squares': move['suggested_moves']})
+            return events
+
+        events.append({'type': 'clear_suggestion'})
+        if move.get('illegal'):
+            events.append({'type': 'illegal', 'move': chess.Move.from_uci(move['start'] + move['end']), 'message': move['illegal']})
+        elif 'uci' in move:
+            # Only moves matched against the legal moves, or the bot's moves, carry a uci
+            events.extend(self.play_move(move))
+        return events
+
+    def play_move(self, move):
+        start_square = move['start']
+        end_square = move['end']
+        chess_move = chess.Move.from_uci(move['uci'])
+        move_data = [move['piece'], start_square, end_square, move.get('eliminated', ''), move.get('castle', '')]
+
+        if chess_move not in self.board.legal_moves:
+            reason = explain_illegal_move(self.board, chess_move)
+            return [{'type': 'illegal', 'move': chess_move, 'message': f"Move {chess_move} is an illegal move: {reason}"}]
+
+        # The evaluation runs in the background, the record shows it as pending until it arrives
+        evaluation = submit_move_evaluation(self.board, chess_move, self.game_id)
+        record = MoveRecord(self.board.turn, *move_data, uci=chess_move.uci())
+        self.board.push(chess_move)
+        move_data.append(pending_evaluation_label)
+        self.previous_board_status = map_board_to_board_status(self.board)
+
+        self.moves.append(record)
+        self.pending_evaluations[len(self.board.move_stack)] = (record, evaluation)
 
+        events = [{'type': 'move', 'move': chess_move, 'move_data': move_data}]
+        status, message = check_win_condition(self.board)
+        if status:
+            events.append({'type': 'game_over', 'status': status, 'message': message})
+        return events
 
-def update_board_display(board):
-    board_svg = chess.svg.board(board=board)
+    def undo(self):
+        # Takes back the last move, returns False if there is none
+        if not self.board.move_stack:
+            return False
+        pending = self.pending_evaluations.pop(len(self.board.move_stack), None)
+        if pending:
+            pending[1].cancel()
+
+        self.board.pop()
+        self.moves.pop()
+        self.previous_board_status = map_board_to_board_status(self.board)
+        return True
+
+    def collect_evaluations(self, wait=False):
+        # Fills in finished evaluations, returns True if any move record changed.
+        # wait blocks until every pending evaluation is done, for headless runs
+        updated = False
+        for ply, (record, evaluation) in list(self.pending_evaluations.items()):
+            if not wait and not evaluation.done():
+                continue
+            del self.pending_evaluations[ply]
+            if evaluation.cancelled():
+                continue
+            try:
+                self.moves.set_evaluation(record, evaluation.result())
+            except Exception as e:
+                print(f"Evaluation failed: {e}")
+                self.moves.set_evaluation(record, "Unknown")
+            updated = True
+        return updated
+
+    def cancel_evaluations(self):
+        for _, evaluation in self.pending_evaluations.values():
+            evaluation.cancel()
+        self.pending_evaluations = {}
+
+
+def start_game(session_state, board:chess.Board = None):
+    # Evaluations still running for the previous game are no longer needed
+    if 'tracker' in session_state:
+        session_state.tracker.cancel_evaluations()
+    session_state.tracker = GameTracker(board)
+
+
+def status_to_board(board_status):
+    # Board for a status with no game history: squares of the initial position keep their piece, any other piece is taken as a pawn
+    initial_board = chess.Board()
+    board = chess.Board(None)
+    for row in range(8):
+        for col in range(8):
+            piece_color = board_status[row][col]
+            if piece_color != EMPTY:
+                square = chess.square(col, 7 - row)
+                initial_piece = initial_board.piece_at(square)
+                board.set_piece_at(square, initial_piece if initial_piece else chess.Piece(chess.PAWN, bool(piece_color == WHITE)))
+    return board
+
+def update_board_display(board, highlighted=(), orientation=chess.WHITE):
+    # Only the pieces are drawn from the board, so the FEN placement is enough to key the render
+    key = (board.board_fen(), orientation, tuple(highlighted))
+    with board_display_lock:
+        board_html = board_display_cache.get(key)
+        if board_html is not None:
+            board_display_cache.move_to_end(key)
+            return board_html
+
+    board_svg = chess.svg.board(
+        board=chess.BaseBoard(key[0]),
+        orientation=orientation,
+        squares=key[2],
+        fill=dict.fromkeys(key[2], highlight_fill),
+    )
     encoded_svg = base64.b64encode(board_svg.encode('utf-8')).decode('utf-8')
-    return f'<img src="data:image/svg+xml;base64,{encoded_svg}" width="400"/>'
+    board_html = f'<img src="data:image/svg+xml;base64,{encoded_svg}" width="400"/>'
+    with board_display_lock:
+        board_display_cache[key] = board_html
+        while len(board_display_cache) > board_display_cache_size:
+            board_display_cache.popitem(last=False)
+    return board_html
+
+def get_move_index(board):
+    # For every legal move, the board status it leads to. Moves are also indexed by the diff they
+    # make to the current status, so a clean detection is matched with one dict lookup
+    # The transposition key holds everything legal moves depend on, and is cheaper than a zobrist hash
+    key = board._transposition_key()
+    with move_index_lock:
+        index = move_index_cache.get(key)
+        if index is not None:
+            move_index_cache.move_to_end(key)
+            return index
+
+    # A move empties its from square and fills its to square, castling also moves the rook and
+    # en passant empties the captured pawn's square. Status index of a square is square ^ 56
+    previous = map_board_to_board_status(board).ravel()
+    moves = list(board.legal_moves)
+    expected = np.tile(previous, (len(moves), 1))
+    color = WHITE if board.turn else BLACK
+    for i, legal_move in enumerate(moves):
+        expected[i, legal_move.from_square ^ 56] = EMPTY
+        expected[i, legal_move.to_square ^ 56] = color
+        if board.is_castling(legal_move):
+            rook_files = (7, 5) if board.is_kingside_castling(legal_move) else (0, 3)
+            rank = chess.square_rank(legal_move.from_square)
+            expected[i, chess.square(rook_files[0], rank) ^ 56] = EMPTY
+            expected[i, chess.square(rook_files[1], rank) ^ 56] = color
+        elif board.is_en_passant(legal_move):
+            expected[i, chess.square(chess.square_file(legal_move.to_square), chess.square_rank(legal_move.from_square)) ^ 56] = EMPTY
+
+    by_signature = {}
+    destinations = {}  # from square -> names of the squares its piece can go to
+    for legal_move, expected_status in zip(moves, expected):
+        by_signature.setdefault(get_diff_signature(previous, expected_status), []).append(legal_move)
+        square_names = destinations.setdefault(legal_move.from_square, [])
+        if chess.square_name(legal_move.to_square) not in square_names:
+            square_names.append(chess.square_name(legal_move.to_square))
+
+    index = {
+        'previous': previous,
+        'moves': moves,
+        'expected': expected,
+        'changes': expected != previous,
+        'by_signature': by_signature,
+        'destinations': destinations,
+    }
+    with move_index_lock:
+        move_index_cache[key] = index
+        # Evict the least recently used positions
+        while len(move_index_cache) > move_index_cache_size:
+            move_index_cache.popitem(last=False)
+    return index
+
+def get_diff_signature(previous, new):
+    # Changed squares and their new codes, the same for every status that differs from previous in the same way
+    changed = np.flatnonzero(previous != new)
+    return changed.tobytes() + new[changed].tobytes()
+
+def match_move(board, new_board_status, confidences=None):
+    # Returns the legal move that best explains the new status, or None.
+    # A move only matches if every square it changes was seen changed that way. Other changed squares
+    # (up to move_match_tolerance) count against it by their detection confidence
+    index = get_move_index(board)
+    observed = np.asarray(new_board_status, dtype=np.uint8).ravel()
+    if not index['moves'] or np.array_equal(observed, index['previous']):
+        return None
 
-def detect_move(previous_board_status, new_board_status, board):
+    candidates = index['by_signature'].get(get_diff_signature(index['previous'], observed))
+    if candidates:
+        # Promotions to different pieces look the same on the board, assume a queen
+        return max(candidates, key=lambda candidate: candidate.promotion or 0)
+
+    weights = np.ones(64) if confidences is None else np.asarray(confidences, dtype=np.float64).ravel()
+    mismatches = index['expected'] != observed
+    usable = ~(mismatches & index['changes']).any(axis=1) & (mismatches.sum(axis=1) <= move_match_tolerance)
+    if not usable.any():
+        return None
+    costs = np.where(usable, (mismatches * weights).sum(axis=1), np.inf)
+    return index['moves'][int(costs.argmin())]
+
+def describe_move(board, chess_move):
+    # The move in the format of detect_move, for a legal move of board
+    piece = board.piece_at(chess_move.from_square)
+    move = {
+        'start': chess.square_name(chess_move.from_square),
+        'end': chess.square_name(chess_move.to_square),
+        'uci': chess_move.uci(),
+        'piece': piece_names[piece.symbol()] if piece else '',
+    }
+    if board.is_en_passant(chess_move):
+        move['eliminated'] = 'pawn'
+    elif board.is_capture(chess_move):
+        move['eliminated'] = piece_names[board.piece_at(chess_move.to_square).symbol()]
+    if board.is_castling(chess_move):
+        side = 'kingside' if board.is_kingside_castling(chess_move) else 'queenside'
+        move['castle'] = f"{'white' if board.turn else 'black'}_{side}"
+    return move
+
+def detect_move(previous_board_status, new_board_status, board, confidences=None):
+    # The legal move whose board status matches the new one, castling, en passant and promotion included
+    chess_move = match_move(board, new_board_status, confidences)
+    if chess_move:
+        return describe_move(board, chess_move)
+
+    # No legal move matches. The changed squares are only read to suggest moves for a lifted piece
+    # or to explain an illegal move, a guess is never returned as a move to play
     move = {}
-    starts = 0
-    ends = 0
-    for row in range(len(previous_board_status)):
-        for col in range(len(previous_board_status[row])):
-            if previous_board_status[row][col] != new_board_status[row][col]:
-                square = chess.square(col, 7 - row) # Returns int
-                square_name = chess.square_name(chess.square(col, 7 - row)) # Returns str 'f2' 
-                piece = board.piece_at(square)
-                if new_board_status[row][col] == 'empty' and previous_board_status[row][col] != 'empty':
-                    starts += 1
-                    move['start'] = square_name
-                    move['piece'] = piece_names[piece.symbol()] if piece else ''
-                elif previous_board_status[row][col] == 'empty' and new_board_status[row][col] != 'empty':
-                    ends +=1
-                    move['end'] = square_name
-                elif previous_board_status[row][col] != new_board_status[row][col]:
-                    ends +=1
-                    move['end'] = square_name
-                    move['eliminated'] = piece_names[piece.symbol()] if piece else ''
-
-    # check for castle movement
-    if 'start' in move and 'end' in move:
-        if move['start'] == "e1" and move['end'] == "g1":
-            move['castle'] = "white_kingside"
-        elif move['start'] == "e1" and move['end'] == "c1":
-            move['castle'] = "white_queenside"
-        elif move['start'] == "e8" and move['end'] == "g8":
-            move['castle'] = "black_kingside"
-        elif move['start'] == "e8" and move['end'] == "c8":
-            move['castle'] = "black_queenside"
-    
+    for square, change in get_status_changes(previous_board_status, new_board_status):
+        square_name = chess.square_name(square) # Returns str 'f2'
+        piece = board.piece_at(square)
+        if change == START:
+            move['start'] = square_name
+            move['piece'] = piece_names[piece.symbol()] if piece else ''
+        elif change == END:
+            move['end'] = square_name
+        else:
+            move['end'] = square_name
+            move['eliminated'] = piece_names[piece.symbol()] if piece else ''
+
     # Suggest move only if just start is detected
     if 'start' in move and not 'end' in move:
         move['suggested_moves'] = suggest_moves(move, board)
         move['is_suggested'] = True
+    elif 'start' in move and 'end' in move:
+        chess_move = chess.Move.from_uci(f"{move['start']}{move['end']}")
+        if chess_move in board.legal_moves:
+            # Legal, but other squares don't fit it, so it isn't what was played
+            move['warning'] = f"The board doesn't match any legal move ({move['start']} to {move['end']} leaves other squares unexplained). Check the pieces."
+        else:
+            move['illegal'] = f"Move {chess_move} is an illegal move: {explain_illegal_move(board, chess_move)}"
     return move
 
 def suggest_moves(move, board: chess.Board):
+    # Destinations come from the cached move index, so a piece held over the board costs one lookup per frame
     start_square = chess.parse_square(move['start'])
-    legal_moves = [m for m in board.legal_moves if m.from_square == start_square]
+    return list(get_move_index(board)['destinations'].get(start_square, []))  # Empty if no legal moves available
 
-    if legal_moves:
-        suggested_moves = [chess.square_name(suggested_move.to_square) for suggested_move in legal_moves]
-        return suggested_moves
+def get_suggestion_svg(board, start):
+    # The board with the destinations of the piece on `start` highlighted, rendered once per position and square
+    destinations = get_move_index(board)['destinations'].get(chess.parse_square(start), [])
+    return update_board_display(board, [chess.parse_square(square_name) for square_name in destinations])
 
-    return []  # No legal moves available
+def get_full_move(board: chess.Board, game_id=None):
+    # The bot's move, described like a detected one so captures and castling reach the move log
+    # The pool already keeps engine access safe, so the bot doesn't queue behind the evaluations
+    best_move = get_best_move(board, game_id)
+    if not best_move:
+        return {}
+    return describe_move(board, chess.Move.from_uci(best_move))
 
-def get_full_move(board: chess.Board):
-    move = {}
+def get_position_key(board):
+    return chess.polyglot.zobrist_hash(board), engine_pool.depth
 
-    stockfish.set_fen_position(board.fen())
-    best_move = stockfish.get_best_move()
+def analyse_position(board, field, analyse):
+    # The cached result of analyse(board), computed at most once per position. A position whose
+    # analysis is still running waits for that result: when moves are fed back to back, one move's
+    # "after" position is still being evaluated while the next move's "before" position is requested
+    key = get_position_key(board)
+    with position_cache_lock:
+        analysis = position_cache.get(key, {})
+        if field in analysis:
+            position_cache.move_to_end(key)
+            position_cache_stats['hits'] += 1
+            return analysis[field]
+        running = position_pending.get((key, field))
+        if running is None:
+            position_cache_stats['misses'] += 1
+            future = position_pending[(key, field)] = Future()
+        else:
+            position_cache_stats['hits'] += 1
+    if running is not None:
+        return running.result()
 
-    if best_move:
-        start_square = chess.parse_square(best_move[:2])
-        piece = board.piece_at(start_square)
-        move['start'] = best_move[:2]
-        move['end'] = best_move[2:4]
-        move['piece'] = piece_names[piece.symbol()] if piece else ''
+    try:
+        value = analyse(board)
+    except BaseException as e:
+        with position_cache_lock:
+            del position_pending[(key, field)]
+        future.set_exception(e)
+        raise
+    with position_cache_lock:
+        position_cache.setdefault(key, {})[field] = value
+        position_cache.move_to_end(key)
+        # Evict the least recently used positions
+        while len(position_cache) > position_cache_size:
+            position_cache.popitem(last=False)
+        del position_pending[(key, field)]
+    future.set_result(value)
+    return value
 
-    return move
+def get_best_move(board, game_id=None):
+    def analyse(board):
+        with engine_pool.lease(game_id) as session:
+            session.set_position(board, game_id)
+            return session.engine.get_best_move()
+    return analyse_position(board, 'best_move', analyse)
 
 def calculate_expected_points(score):
     return 1 / (1 + 10 ** (-score / 400))
 
-def evaluate_position(board):
-    moves = board.move_stack
-    moves_list = [move.uci() for move in moves]
-
-    stockfish.set_position(moves_list)
-    evaluation = stockfish.get_evaluation()
+def evaluate_position(board, game_id=None):
+    def analyse(board):
+        # Positions of the same game reuse the engine's hash table instead of replaying the whole move list
+        with engine_pool.lease(game_id) as session:
+            session.set_position(board, game_id)
+            evaluation = session.engine.get_evaluation()
 
-    if evaluation['type'] == 'mate':
-        score = 10000 if evaluation['value'] > 0 else -10000
-    else:
+        if evaluation['type'] == 'mate':
+            return 10000 if evaluation['value'] > 0 else -10000
         # For centipawn evaluations
-        score = evaluation['value']
-    return score
+        return evaluation['value']
+    return analyse_position(board, 'score', analyse)
 
 def get_move_evaluation(eval_before, eval_after):
     ep_before = calculate_expected_points(eval_before)
@@ -135,6 +496,16 @@ def get_move_evaluation(eval_before, eval_after):
     print(f"Classification: {classification}")
     return classification
 
+def evaluate_move(board, chess_move, game_id=None):
+    eval_before = evaluate_position(board, game_id)
+    board.push(chess_move)
+    eval_after = evaluate_position(board, game_id)
+    return get_move_evaluation(eval_before, eval_after)
+
+def submit_move_evaluation(board, chess_move, game_id=None):
+    # Evaluates on a copy in the background so the caller can push the move right away
+    return engine_executor.submit(evaluate_move, board.copy(), chess_move, game_id)
+
 def update_chessboard(move, chessboard):
     start = move['start']
     end = move['end']
@@ -165,33 +536,3 @@ def explain_illegal_move(board, chess_move):
         else:
             return "The move would place or leave the king in check."
     return "Unknown reason"
-
-def export_to_pdf(white_moves, black_moves):
-    from io import BytesIO
-    pdf = BytesIO()
-    c = canvas.Canvas(pdf)
-    c.setFont("Helvetica", 16)
-    c.drawString(200, 800, "Chess Game Move History")
-    c.setFont("Helvetica", 14)
-
-    y = 760
-    c.drawString(100, y, "White Player Moves:")
-    y -= 20
-    for index, row in white_moves.iterrows():
-        castle = f"Castle: {row['castle']}" if row['castle'] else ""
-        eliminated = f"Eliminated: {row['Eliminated']}" if row['Eliminated'] else ''
-        c.drawString(100, y, f"{str(row['Piece'])} from {row['From']} to {row['To']} {eliminated} {castle} Evaluation: {row['evaluation']}")
-        y -= 20
-
-    y -= 40
-    c.drawString(100, y, "Black Player Moves:")
-    y -= 20
-    for index, row in black_moves.iterrows():
-        castle = f"Castle: {row['castle']}" if row['castle'] else ""
-        eliminated = f"Eliminated: {row['Eliminated']}"  if row['Eliminated'] else ''
-        c.drawString(100, y, f"{str(row['Piece'])} from {row['From']} to {row['To']} {eliminated} {castle} Evaluation: {row['evaluation']}")
-        y -= 20
-
-    c.save()
-    pdf.seek(0)
-    return pdf
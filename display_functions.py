@@ -0,0 +1,252 @@
+import time
+
+import chess
+import streamlit as st
+
+from camera_functions import FrameGrabber, MotionGate, camera_source, motion_check_fps
+from chess_functions import get_suggestion_svg, start_game, update_board_display
+from export_functions import export_to_json, export_to_pdf, export_to_pgn
+from frame_processing_functions import BoardDetector, StatusFilter, display_board_status, weight_path
+from model_functions import detection_timeout, get_detection_service
+
+
+class GameView:
+    """Shows a GameTracker and its events in the placeholders of a page.
+
+    Each page lays out its own placeholders and creates a view with them on every run. The board
+    and the move tables are only sent to the browser when they differ from what the view already
+    showed during this run.
+    """
+
+    def __init__(self, tracker, board, white_moves, black_moves, previous_status, new_status,
+                 summary, detection, suggestion, warning, result):
+        self.tracker = tracker
+        self.board = board
+        self.moves = {chess.WHITE: white_moves, chess.BLACK: black_moves}
+        self.previous_status = previous_status
+        self.new_status = new_status
+        self.summary = summary
+        self.detection = detection
+        self.suggestion = suggestion
+        self.warning = warning
+        self.result = result
+        self.shown_board_html = None
+        self.shown_moves_versions = {}  # color -> move log version the table shows
+
+    def show_board(self, board_html=None):
+        # The tracker's board unless another render (such as a suggestion) is given
+        board_html = board_html or update_board_display(self.tracker.board)
+        if board_html != self.shown_board_html:
+            self.board.markdown(board_html, unsafe_allow_html=True)
+            self.shown_board_html = board_html
+
+    def show_moves(self):
+        # A table is only redrawn when its moves changed
+        moves = self.tracker.moves
+        for color, placeholder in self.moves.items():
+            if moves.versions[color] != self.shown_moves_versions.get(color):
+                placeholder.dataframe(moves.frame(color))
+                self.shown_moves_versions[color] = moves.versions[color]
+
+    def show_detection(self, info):
+        # What BoardDetector.detect found in a frame
+        if info['warning']:
+            self.warning.warning(info['warning'])
+        if info['summary']:
+            self.summary.write(info['summary'])
+        if info['plot'] is not None:
+            self.detection.image(info['plot'], channels="BGR", use_container_width=True)
+
+    def render_events(self, events):
+        # Shows what the tracker did with a board status
+        for event in events:
+            if event['type'] == 'status':
+                # Display Board status if there are issues
+                self.previous_status.image(display_board_status(event['previous']))
+                self.new_status.image(display_board_status(event['new']))
+
+            elif event['type'] == 'warning':
+                self.suggestion.write(event['message'])
+
+            # For Move Suggestion Feature
+            elif event['type'] == 'suggestion':
+                # Check if there are no legal moves
+                if not event['squares']:
+                    self.suggestion.warning('No moves available')
+                    continue
+
+                self.suggestion.write(f"The available moves for the {event['piece']} are:")
+                self.show_board(get_suggestion_svg(self.tracker.board, event['start']))
+
+            # Remove suggestions
+            elif event['type'] == 'clear_suggestion':
+                self.suggestion.empty()
+                self.show_board()
+
+            elif event['type'] == 'move':
+                self.warning.empty()
+                self.show_board()
+                self.show_moves()
+
+            elif event['type'] == 'illegal':
+                self.warning.warning(event['message'])
+
+            # Check win and display message
+            elif event['type'] == 'game_over':
+                if event['status'] == "success":
+                    self.result.success(event['message'])
+                else:
+                    self.result.warning(event['message'])
+
+
+class LiveGame:
+    """A game played in front of the camera, kept in the session state between reruns.
+
+    Frames go through the shared detection service and a board status only reaches the tracker
+    once the status filter agrees on every changed square. With bot_color set, Stockfish plays
+    that side. The live pages only lay out their placeholders and hand them to the methods here.
+    """
+
+    def __init__(self, session_state, model, bot_color=None):
+        if 'tracker' not in session_state:
+            start_game(session_state)
+        # Frames of this camera go through the shared detection service, looked up on every frame
+        # so a service that was started again replaces one that stopped
+        if 'live_detector' not in session_state:
+            session_state.live_detector = BoardDetector(
+                lambda frame, conf: get_detection_service(weight_path).submit(frame, conf).result(timeout=detection_timeout),
+                model.names,
+            )
+        # A status only reaches the game once every changed square agrees over a few detections
+        if 'status_filter' not in session_state:
+            session_state.status_filter = StatusFilter(window=3, min_votes=2)
+
+        self.session_state = session_state
+        self.tracker = session_state.tracker
+        self.detector = session_state.live_detector
+        self.status_filter = session_state.status_filter
+        self.bot_color = bot_color
+
+    def restart(self, board=None):
+        # A new game, from the starting position or a saved board
+        start_game(self.session_state, board)
+        self.status_filter.reset()
+        st.rerun()
+
+    def show_saved_boards(self, text, selector, button):
+        # Lets the player restart from one of the boards saved on the image page
+        if 'saved_boards' not in self.session_state:
+            return
+        text.write("Select from the following boards to start from it. This will restart your current game.")
+
+        saved_boards = self.session_state.saved_boards
+        board_names = [list(saved_board.keys())[0] for saved_board in saved_boards]
+        selected_board_name = selector.selectbox(options=board_names, label="Select a board")
+
+        if selected_board_name:
+            # Find the corresponding board dictionary using the selected name
+            selected_board_data = next(
+                (board[selected_board_name] for board in saved_boards if selected_board_name in board),
+                None
+            )
+
+            if selected_board_data and button.button("Start From This"):
+                self.restart(selected_board_data)
+
+    def undo(self, view):
+        if self.tracker.undo():
+            # The board in front of the camera is read again, it may still show the undone move
+            self.status_filter.reset()
+            view.show_moves()
+            view.show_board()
+
+    def process_frame(self, frame, view):
+        new_board_status, info = self.detector.detect(frame, self.tracker.previous_board_status)
+
+        # Display the detection
+        view.show_detection(info)
+
+        if new_board_status is None:
+            return
+
+        filtered_status = self.status_filter.update(new_board_status)
+        # The bot's moves don't wait for the board to change
+        if filtered_status is None and self.tracker.board.turn == self.bot_color:
+            filtered_status = self.status_filter.status
+        if filtered_status is not None:
+            view.render_events(self.tracker.feed(filtered_status, bot_color=self.bot_color,
+                                                 confidences=self.status_filter.confidence))
+
+    def run(self, view, frame_placeholder):
+        # Frames are captured on a background thread so the camera keeps running while a frame is processed
+        grabber = FrameGrabber(camera_source)
+        if not grabber.start():
+            st.error("Unable to access the camera.")
+            return
+
+        # Detection only runs when the board is still and something on it changed
+        gate = MotionGate()
+        frame_interval = 1 / motion_check_fps
+
+        try:
+            while True:
+                loop_start = time.perf_counter()
+                frame = grabber.read()
+                if frame is None:
+                    view.warning.warning("Failed to capture frame. Retrying...")
+                    continue
+
+                # Display the live video frame
+                frame_placeholder.image(frame, channels="BGR", use_container_width=True)
+                # Until the board grid is fitted every frame may be needed to find a good threshold,
+                # and still frames are detected again until the status filter agrees on every square
+                geometry = self.detector.geometry
+                if gate.should_infer(frame, geometry.homography if geometry.is_valid() else None,
+                                     force=not geometry.is_valid(), recheck=self.status_filter.is_pending()):
+                    try:
+                        self.process_frame(frame, view)
+                    except Exception as e:
+                        st.error(f"Frame Processing error: {e}")
+
+                # Show evaluations that finished in the background
+                if self.tracker.collect_evaluations():
+                    view.show_moves()
+
+                # Keep the check rate steady, the grabber keeps only the newest frame meanwhile
+                remaining = frame_interval - (time.perf_counter() - loop_start)
+                if remaining > 0:
+                    time.sleep(remaining)
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+        finally:
+            grabber.stop()
+
+
+def show_exports(tracker):
+    # Download buttons for the move history. Each file is made from the moves played so far when its
+    # button is clicked, from a copy of the move list since detection may still be adding moves.
+    # Clicking doesn't rerun the page, so live detection keeps going
+    include_diagrams = st.checkbox("Include board diagrams in the PDF")
+    st.download_button(
+        label="Download Move History as PDF",
+        data=lambda: export_to_pdf(list(tracker.moves), tracker.start_board, diagrams=include_diagrams).getvalue(),
+        file_name="chess_move_history.pdf",
+        mime="application/pdf",
+        on_click="ignore",
+    )
+
+    pgn_col, json_col = st.columns(2)
+    pgn_col.download_button(
+        label="Download Game as PGN",
+        data=lambda: export_to_pgn(list(tracker.moves), tracker.start_board),
+        file_name="chess_game.pgn",
+        mime="application/x-chess-pgn",
+        on_click="ignore",
+    )
+    json_col.download_button(
+        label="Download Moves as JSON",
+        data=lambda: export_to_json(list(tracker.moves), tracker.start_board),
+        file_name="chess_moves.json",
+        mime="application/json",
+        on_click="ignore",
+    )
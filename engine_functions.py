@@ -0,0 +1,154 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from stockfish import Stockfish, StockfishException
+
+engine_pool_size = 2
+engine_depth = 15
+engine_threads = 1
+engine_hash = 16  # MB per engine
+health_check_interval = 60  # Seconds without a lease after which the idle engines are checked first
+
+
+class EngineSession:
+    """A pooled engine plus what was last sent to it.
+
+    Positions of the same game are sent without `ucinewgame`, so Stockfish keeps its hash table
+    warm from one move to the next, and a position that is already set isn't sent again.
+    The position is sent as a FEN, which stays the same size however long the game gets.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.game_id = None
+        self.fen = None
+        self.positions_sent = 0
+        self.new_games = 0
+
+    def set_position(self, board, game_id=None):
+        fen = board.fen()
+        if game_id is not None and game_id == self.game_id:
+            if fen == self.fen:
+                return
+            self.engine.set_fen_position(fen, send_ucinewgame_token=False)
+        else:
+            # Unknown or different game, start from a clean hash table
+            self.engine.set_fen_position(fen)
+            self.new_games += 1
+
+        self.game_id = game_id
+        self.fen = fen
+        self.positions_sent += 1
+
+    def reset(self):
+        self.game_id = None
+        self.fen = None
+
+
+class EnginePool:
+    """A fixed set of long-lived Stockfish processes that are leased out for one query at a time.
+
+    Sessions never share an engine mid-query, so concurrent users can't race on set_position.
+    A lease for a game prefers the idle engine that last worked on that game to keep its hash
+    table warm. Crashed engines are replaced when they are leased, and a lease after the pool sat
+    idle for health_check_interval seconds first runs health_check on every idle engine.
+    """
+
+    def __init__(self, path, size=engine_pool_size, depth=engine_depth, threads=engine_threads, hash_size=engine_hash):
+        self.path = path
+        self.size = size
+        self.depth = depth
+        self.parameters = {"Threads": threads, "Hash": hash_size}
+        self.idle_sessions = []
+        self.idle_condition = threading.Condition()
+        self.metrics_lock = threading.Lock()
+        self.metrics = {'leases': 0, 'queue_wait': 0.0, 'max_queue_wait': 0.0, 'busy_time': 0.0, 'restarts': 0}
+        self.last_lease = time.perf_counter()
+
+        for _ in range(size):
+            self.idle_sessions.append(EngineSession(self._start_engine()))
+
+    def _start_engine(self):
+        return Stockfish(self.path, depth=self.depth, parameters=self.parameters)
+
+    def _restart_engine(self, session):
+        try:
+            session.engine.send_quit_command()
+        except Exception:
+            pass
+        with self.metrics_lock:
+            self.metrics['restarts'] += 1
+        session.engine = self._start_engine()
+        session.reset()
+
+    @staticmethod
+    def is_alive(session):
+        return session.engine._stockfish.poll() is None
+
+    def _take_idle_session(self, game_id, timeout):
+        with self.idle_condition:
+            if not self.idle_condition.wait_for(lambda: self.idle_sessions, timeout=timeout):
+                raise TimeoutError(f"No Stockfish engine became available within {timeout} seconds")
+            for index, session in enumerate(self.idle_sessions):
+                if game_id is not None and session.game_id == game_id:
+                    return self.idle_sessions.pop(index)
+            return self.idle_sessions.pop(0)
+
+    def _return_session(self, session):
+        with self.idle_condition:
+            self.idle_sessions.append(session)
+            self.idle_condition.notify()
+
+    @contextmanager
+    def lease(self, game_id=None, timeout=None):
+        wait_start = time.perf_counter()
+        # Engines may have died while nobody was using the pool
+        if wait_start - self.last_lease > health_check_interval:
+            self.health_check()
+        self.last_lease = wait_start
+        session = self._take_idle_session(game_id, timeout)
+        queue_wait = time.perf_counter() - wait_start
+
+        busy_start = time.perf_counter()
+        try:
+            if not self.is_alive(session):
+                self._restart_engine(session)
+            yield session
+        except StockfishException:
+            # The process died mid-query, hand a fresh one back to the pool
+            self._restart_engine(session)
+            raise
+        finally:
+            busy_time = time.perf_counter() - busy_start
+            self._return_session(session)
+            with self.metrics_lock:
+                self.metrics['leases'] += 1
+                self.metrics['queue_wait'] += queue_wait
+                self.metrics['max_queue_wait'] = max(self.metrics['max_queue_wait'], queue_wait)
+                self.metrics['busy_time'] += busy_time
+
+    def health_check(self):
+        # Restarts dead engines that are currently idle, returns how many were restarted
+        restarted = 0
+        with self.idle_condition:
+            for session in self.idle_sessions:
+                if not self.is_alive(session):
+                    self._restart_engine(session)
+                    restarted += 1
+        return restarted
+
+    def stats(self):
+        with self.idle_condition:
+            idle = len(self.idle_sessions)
+        with self.metrics_lock:
+            leases = self.metrics['leases']
+            return {
+                'engines': self.size,
+                'idle': idle,
+                'leases': leases,
+                'avg_queue_wait': self.metrics['queue_wait'] / leases if leases else 0.0,
+                'max_queue_wait': self.metrics['max_queue_wait'],
+                'avg_busy_time': self.metrics['busy_time'] / leases if leases else 0.0,
+                'restarts': self.metrics['restarts'],
+            }
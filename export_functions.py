@@ -0,0 +1,158 @@
+import json
+from io import BytesIO
+
+import chess
+import chess.pgn
+from reportlab.lib.colors import HexColor, black, white
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+pdf_margin = 50
+pdf_row_height = 18
+pdf_columns = (50, 130, 430)  # x of the move number, the move and the evaluation
+pdf_diagram_size = 120  # Points per board diagram, 15 per square
+light_square_color = HexColor("#ffce9e")  # Same colors as chess.svg
+dark_square_color = HexColor("#d18b47")
+
+
+def replay_moves(moves, board=None):
+    # Yields (record, SAN, board after the move) for the move records of a game started from board
+    board = board.copy(stack=False) if board else chess.Board()
+    for record in moves:
+        chess_move = chess.Move.from_uci(record.uci)
+        san = board.san(chess_move)
+        board.push(chess_move)
+        yield record, san, board
+
+
+def describe_record(record, san, board_after):
+    # (move number and SAN, what moved, evaluation) of a move row
+    if record.color == chess.WHITE:
+        number = f"{board_after.fullmove_number}."
+    else:
+        number = f"{board_after.fullmove_number - 1}..."
+    eliminated = f" Eliminated: {record.eliminated}" if record.eliminated else ""
+    castle = f" Castle: {record.castle}" if record.castle else ""
+    return f"{number} {san}", f"{record.piece} from {record.start} to {record.end}{eliminated}{castle}", f"Evaluation: {record.evaluation}"
+
+
+def start_pdf_page(c, page):
+    # Draws the page header and number, returns the y of the first row
+    width, height = c._pagesize
+    c.setFont("Helvetica", 9)
+    c.drawRightString(width - pdf_margin, pdf_margin / 2, f"Page {page}")
+    if page == 1:
+        c.setFont("Helvetica", 16)
+        c.drawString(200, height - 42, "Chess Game Move History")
+        y = height - 72
+    else:
+        y = height - pdf_margin
+    c.setFont("Helvetica", 10)
+    return y
+
+
+def define_board_form(c):
+    # The empty board is drawn once and reused by every diagram, only the pieces are drawn per move
+    square_size = pdf_diagram_size / 8
+    c.beginForm("board")
+    c.setStrokeColor(black)
+    for row in range(8):
+        for col in range(8):
+            c.setFillColor(light_square_color if (row + col) % 2 else dark_square_color)
+            c.rect(col * square_size, row * square_size, square_size, square_size, stroke=0, fill=1)
+    c.rect(0, 0, pdf_diagram_size, pdf_diagram_size, stroke=1, fill=0)
+    c.endForm()
+
+
+def draw_board_diagram(c, board, x, y):
+    # Board with white at the bottom, its lower left corner at (x, y). White pieces are outlined letters
+    square_size = pdf_diagram_size / 8
+    c.saveState()
+    c.translate(x, y)
+    c.doForm("board")
+    text = c.beginText()
+    text.setFont("Helvetica-Bold", square_size * 0.8)
+    c.setStrokeColor(black)
+    for square, piece in board.piece_map().items():
+        text.setTextOrigin(chess.square_file(square) * square_size + square_size * 0.22,
+                           chess.square_rank(square) * square_size + square_size * 0.2)
+        if piece.color == chess.WHITE:
+            text.setTextRenderMode(2)  # Fill and stroke
+            text.setFillColor(white)
+        else:
+            text.setTextRenderMode(0)
+            text.setFillColor(black)
+        text.textOut(piece.symbol().upper())
+    c.drawText(text)
+    c.restoreState()
+
+
+def export_to_pdf(moves, board=None, diagrams=False, output=None):
+    # Writes the moves in play order, one row per move, to output (a path or a file object).
+    # A page is finished as soon as it is full, so long games continue over as many pages as needed.
+    # With diagrams every move also shows the board after it. Returns a BytesIO if no output is given
+    pdf = output if output is not None else BytesIO()
+    c = canvas.Canvas(pdf, pagesize=A4)
+    width, _ = A4
+    row_height = pdf_diagram_size + 10 if diagrams else pdf_row_height
+    if diagrams:
+        define_board_form(c)
+
+    page = 1
+    y = start_pdf_page(c, page)
+    for record, san, board_after in replay_moves(moves, board):
+        if y - row_height < pdf_margin:
+            c.showPage()
+            page += 1
+            y = start_pdf_page(c, page)
+        texts = describe_record(record, san, board_after)
+        if diagrams:
+            # The texts go one under the other, left of the diagram
+            for line, text in enumerate(texts):
+                c.drawString(pdf_margin, y - 14 - line * pdf_row_height, text)
+            draw_board_diagram(c, board_after, width - pdf_margin - pdf_diagram_size, y - pdf_diagram_size)
+        else:
+            for x, text in zip(pdf_columns, texts):
+                c.drawString(x, y - 14, text)
+        y -= row_height
+
+    c.save()
+    if output is None:
+        pdf.seek(0)
+    return pdf
+
+
+def export_to_pgn(moves, board=None, headers=None):
+    # The game as PGN text, each move with its evaluation as a comment
+    game = chess.pgn.Game()
+    if board and board.fen() != chess.STARTING_FEN:
+        game.setup(board)
+    for name, value in (headers or {}).items():
+        game.headers[name] = value
+
+    node, final_board = game, board or chess.Board()
+    for record, _, final_board in replay_moves(moves, board):
+        node = node.add_variation(final_board.peek())
+        node.comment = str(record.evaluation)
+    game.headers["Result"] = final_board.result()
+    return str(game) + "\n\n"
+
+
+def export_to_json(moves, board=None):
+    # The moves as a JSON list in play order, with the position after each one
+    return json.dumps([
+        {
+            'ply': ply + 1,
+            'color': 'white' if record.color == chess.WHITE else 'black',
+            'piece': record.piece,
+            'from': record.start,
+            'to': record.end,
+            'eliminated': record.eliminated,
+            'castle': record.castle,
+            'uci': record.uci,
+            'san': san,
+            'evaluation': record.evaluation,
+            'fen': board_after.fen(),
+        }
+        for ply, (record, san, board_after) in enumerate(replay_moves(moves, board))
+    ], indent=1)
@@ -1,66 +1,435 @@
-import matplotlib.pyplot as plt
-from matplotlib.colors import to_rgba
+import numpy as np
+import cv2
+import hashlib
+import threading
+from collections import OrderedDict, deque
 
 import chess
 
 weight_path = 'weights/bestV13.pt'
 
+# Board status is an 8x8 uint8 array, row 0 is rank 8 and column 0 is file a
+EMPTY, WHITE, BLACK = 0, 1, 2
+status_codes = {'empty': EMPTY, 'white': WHITE, 'black': BLACK}
+
+# Inference keeps every box above this score, the board grid then picks one box per square
+conf_floor = 0.25
+
+# Decoded uploads by content hash, so reruns of a page don't decode the same image again
+decoded_image_cache = OrderedDict()
+decoded_image_cache_size = 16
+decoded_image_cache_lock = threading.Lock()
+
+# Board status images by status, the same few statuses are shown again and again during a game
+status_image_cache = OrderedDict()
+status_image_cache_size = 64
+status_image_lock = threading.Lock()
+status_square_size = 50  # Pixels per square of the status image
+status_colors = np.zeros((3, 3), dtype=np.uint8)
+status_colors[EMPTY] = (0xDD, 0xDD, 0xDD)  # Gray for empty squares
+status_colors[WHITE] = (0xFF, 0xFF, 0xFF)
+status_colors[BLACK] = (0x00, 0x00, 0x00)
+
+# Square changes reported by get_status_changes
+START, END, CAPTURE = 'start', 'end', 'capture'
+
+def decode_image(data):
+    # Decodes encoded image bytes in memory, an UploadedFile's getbuffer() is used without copying it.
+    # Returns a read-only BGR image shared by every caller, or None if the bytes aren't an image
+    buffer = memoryview(data)
+    key = hashlib.blake2b(buffer, digest_size=16).digest()
+    with decoded_image_cache_lock:
+        image = decoded_image_cache.get(key)
+        if image is not None:
+            decoded_image_cache.move_to_end(key)
+            return image
+
+    image = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    image.setflags(write=False)
+
+    with decoded_image_cache_lock:
+        decoded_image_cache[key] = image
+        # Evict the least recently used images
+        while len(decoded_image_cache) > decoded_image_cache_size:
+            decoded_image_cache.popitem(last=False)
+    return image
+
 def map_board_to_board_status(board):
+    # Unpack the occupancy bitboards (bit index = chess square, a1 = 0) into an 8x8 grid
+    white = np.unpackbits(np.array([board.occupied_co[chess.WHITE]], dtype='<u8').view(np.uint8), bitorder='little')
+    black = np.unpackbits(np.array([board.occupied_co[chess.BLACK]], dtype='<u8').view(np.uint8), bitorder='little')
+    board_status = (white * WHITE + black * BLACK).astype(np.uint8)
 
-    board_status = [['empty' for _ in range(8)] for _ in range(8)]
-    
-    # Loop through all squares on the chess board
-    for row in range(8):
-        for col in range(8):
-            square = chess.square(col, 7 - row)  # Convert row, col to square index
-            piece = board.piece_at(square)  # Get the piece at this square
-            
-            if piece:
-                board_status[row][col] = 'white' if piece.color else 'black'
-                
-    
-    return board_status
+    # Square index runs from rank 1 up, the status rows run from rank 8 down
+    return board_status.reshape(8, 8)[::-1].copy()
 
-def order_detections(boxes, classes):
-    board_status = [] # Will be 2-d array that contains the classes
-    detections = []
+def get_status_codes(predicted_classes, class_names):
+    # Maps model class indices to status codes with one lookup, class_names is model.names
+    lookup = np.zeros(max(class_names) + 1, dtype=np.uint8)
+    for class_index, name in class_names.items():
+        lookup[class_index] = status_codes[name]
+    return lookup[np.asarray(predicted_classes, dtype=np.int64)]
+
+def get_box_centers(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32)
+    return np.column_stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2))
+
+def get_detection_order(boxes):
+    # Returns an 8x8 array of box indices laid out like the board
+    centers = get_box_centers(boxes)
 
     # assuming the number of boxes is always 64
-    index = 0
-    for box in boxes:
-        x_center = ((box[0] + box[2]) / 2)
-        y_center = ((box[1] + box[3]) / 2)
-        detections.append({'box': index, 'x_center': x_center, 'y_center': y_center, 'class': classes[index]})
+    # Sort by y_center and split into 8 rows, then sort each row by x_center
+    rows = np.argsort(centers[:, 1], kind='stable').reshape(8, 8)
+    columns = np.argsort(centers[:, 0][rows], axis=1, kind='stable')
+    return np.take_along_axis(rows, columns, axis=1)
 
-        index += 1
-        
-    # Step 1: Sort detections by y_center to determine rows
-    detections = sorted(detections, key=lambda d: d['y_center'])
+def order_detections(boxes, classes):
+    # boxes: (64, 4) xyxy array, classes: status code per box
+    return np.asarray(classes, dtype=np.uint8)[get_detection_order(boxes)]
 
-    # Step 2: Divide detections into 8 rows
-    rows = [detections[i * 8:(i + 1) * 8] for i in range(8)]
+def fit_board_homography(boxes):
+    # Maps image coordinates to board coordinates where square (row, col) spans [col, col + 1] x [row, row + 1].
+    # Needs a frame with all 64 boxes, RANSAC drops the few that the simple ordering puts in the wrong square.
+    centers = get_box_centers(boxes)[get_detection_order(boxes).ravel()]
+    rows, cols = np.divmod(np.arange(64), 8)
+    square_centers = np.column_stack((cols + 0.5, rows + 0.5)).astype(np.float32)
+    homography, _ = cv2.findHomography(centers, square_centers, cv2.RANSAC, 0.25)
+    return homography
 
-    # Step 3: Sort each row by x_center to determine columns
-    for row in rows:
-        sorted_row = sorted(row, key=lambda d: d['x_center'])
-        board_status.append([cell['class'] for cell in sorted_row])
+def suppress_overlaps(boxes, confidences, iou_threshold=0.5):
+    # Class-agnostic NMS. YOLO only suppresses overlaps within a class, so one square can come back
+    # as both 'white' and 'empty'. Returns the kept box indices from the most to the least confident
+    boxes = np.asarray(boxes, dtype=np.float32)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-np.asarray(confidences), kind='stable')
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        width = np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0])
+        height = np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1])
+        intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+        order = rest[intersection <= iou_threshold * (areas[best] + areas[rest] - intersection)]
+    return np.array(keep, dtype=np.int64)
 
-    return board_status
+def select_board_boxes(boxes, confidences):
+    # Indices of the 64 most confident boxes that don't overlap, the boxes a board is read from.
+    # Fewer than 64 means some squares weren't found
+    return suppress_overlaps(boxes, confidences)[:64]
 
-def display_board_status(board_status):
-    color_mapping = {
-        'black': '#000000',  # Black
-        'white': '#FFFFFF',  # White
-        'empty': '#DDDDDD'   # Gray for empty squares
-    }
+class BoardGeometry:
+    """Caches the board homography while the camera stays still.
+
+    Each frame is downsampled and a few reference corners are tracked with sparse optical flow.
+    When they drift the cached transform is marked stale and refit from the next 64-box frame.
+    """
+
+    def __init__(self, drift_threshold=3.0, scale=0.25, max_corners=100):
+        self.drift_threshold = drift_threshold  # Pixels at full resolution
+        self.scale = scale
+        self.max_corners = max_corners
+        self.homography = None
+        self.reference_gray = None
+        self.reference_corners = None
+        self.stale = False
+        self.recomputes = 0
+        self.last_drift = 0.0
+
+    def _to_small_gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def is_valid(self):
+        return self.homography is not None and not self.stale
+
+    def check_motion(self, frame):
+        if self.homography is None or self.stale:
+            return
+        gray = self._to_small_gray(frame)
+        if self.reference_corners is None or gray.shape != self.reference_gray.shape:
+            self.stale = True
+            return
+
+        corners, found, _ = cv2.calcOpticalFlowPyrLK(self.reference_gray, gray, self.reference_corners, None)
+        found = found.ravel() == 1
+        if found.sum() < len(found) // 2:
+            self.stale = True
+            return
+
+        # The median ignores the few corners that belong to a moving piece or hand
+        drift = np.linalg.norm((corners - self.reference_corners).reshape(-1, 2)[found], axis=1)
+        self.last_drift = float(np.median(drift)) / self.scale
+        if self.last_drift > self.drift_threshold:
+            self.stale = True
+
+    def fit(self, boxes, frame):
+        homography = fit_board_homography(boxes)
+        if homography is None:
+            return False
+
+        self.homography = homography
+        self.reference_gray = self._to_small_gray(frame)
+        self.reference_corners = cv2.goodFeaturesToTrack(self.reference_gray, self.max_corners, 0.01, 5)
+        self.stale = False
+        self.last_drift = 0.0
+        self.recomputes += 1
+        return True
+
+    def summary(self):
+        if self.homography is None:
+            state = "not fitted"
+        elif self.stale:
+            state = "stale, waiting for a 64 box frame"
+        else:
+            state = f"cached (drift {self.last_drift:.1f}px)"
+        return f"Board transform: {state} | Recomputed {self.recomputes} times"
+
+class SquareClassifier:
+    """Fast path that classifies the 64 squares from a top-down crop of the board, without YOLO.
+
+    The board is warped with the cached homography and cut into 64 tiles. Each tile is described
+    by its color, texture and edge strength, and labeled by the nearest class centroid. Centroids
+    are learned from frames the YOLO detector already labeled, separately for light and dark
+    squares, so the classifier adapts to the board, the pieces and the lighting in front of it.
+    """
+
+    def __init__(self, tile_size=32, margin=0.2, max_distance_ratio=0.8, recalibrate_every=30):
+        self.tile_size = tile_size
+        self.margin = int(tile_size * margin)  # Square borders are ignored, pieces rarely fill them
+        self.max_distance_ratio = max_distance_ratio  # Nearest / second nearest centroid, above it a square is uncertain
+        self.recalibrate_every = recalibrate_every  # Fast frames between YOLO runs
+        self.centroids = None  # (class, square shade, feature)
+        self.feature_scale = None
+        self.fast_frames = 0
+        rows, cols = np.divmod(np.arange(64), 8)
+        self.square_shades = (rows + cols) % 2  # 0 for light squares, 1 for dark squares
+
+    def is_calibrated(self):
+        return self.centroids is not None
+
+    def needs_yolo(self):
+        return not self.is_calibrated() or self.fast_frames >= self.recalibrate_every
+
+    def tile_features(self, frame, homography):
+        # Warps the board to an 8x8 grid of tiles and returns a (64, features) array
+        size = self.tile_size * 8
+        to_tiles = np.diag([float(self.tile_size), float(self.tile_size), 1.0]) @ homography
+        board_image = cv2.warpPerspective(frame, to_tiles, (size, size))
+
+        lab = cv2.cvtColor(board_image, cv2.COLOR_BGR2LAB).astype(np.float32)
+        edges = np.abs(cv2.Laplacian(lab[:, :, 0], cv2.CV_32F))
 
-    # Convert the board to an RGBA color matrix
-    color_matrix = [[to_rgba(color_mapping[cell]) for cell in row] for row in board_status]
+        inner = slice(self.margin, self.tile_size - self.margin)
+        lab_tiles = lab.reshape(8, self.tile_size, 8, self.tile_size, 3)[:, inner, :, inner].transpose(0, 2, 1, 3, 4).reshape(64, -1, 3)
+        edge_tiles = edges.reshape(8, self.tile_size, 8, self.tile_size)[:, inner, :, inner].transpose(0, 2, 1, 3).reshape(64, -1)
+        return np.column_stack((
+            lab_tiles.mean(axis=1),
+            lab_tiles[:, :, 0].std(axis=1),
+            edge_tiles.mean(axis=1),
+        ))
 
-    # Plot the heatmap
-    fig, ax = plt.subplots(figsize=(8, 8))
+    def calibrate(self, frame, homography, board_status):
+        features = self.tile_features(frame, homography)
+        labels = np.asarray(board_status).ravel()
+        self.feature_scale = features.std(axis=0) + 1e-6
 
-    # Create a grid
-    ax.imshow(color_matrix, extent=[0, 8, 0, 8])
+        # Squares of a class that doesn't appear on one shade fall back to the class mean over both shades
+        centroids = np.full((3, 2, features.shape[1]), np.inf, dtype=np.float32)
+        for code in (EMPTY, WHITE, BLACK):
+            in_class = labels == code
+            if not in_class.any():
+                continue
+            for shade in (0, 1):
+                on_shade = in_class & (self.square_shades == shade)
+                centroids[code, shade] = features[on_shade].mean(axis=0) if on_shade.any() else features[in_class].mean(axis=0)
+        self.centroids = centroids / self.feature_scale
+        self.fast_frames = 0
+
+    def classify(self, frame, homography):
+        # Returns the board status and the number of squares the classifier isn't sure about
+        features = self.tile_features(frame, homography) / self.feature_scale
+        centroids = self.centroids[:, self.square_shades]  # (class, square, feature)
+        distances = np.linalg.norm(centroids - features[None], axis=2)
+        distances[~np.isfinite(distances)] = np.inf
+
+        nearest = np.sort(distances, axis=0)
+        uncertain = int((nearest[0] > self.max_distance_ratio * nearest[1]).sum())
+        self.fast_frames += 1
+        return distances.argmin(axis=0).astype(np.uint8).reshape(8, 8), uncertain
+
+def locate_detections(boxes, classes, confidences, homography, previous_board_status):
+    # Puts every detection on the square its center projects to, works for any number of boxes.
+    # Returns the board status, the number of squares that were filled from the previous status
+    # and the confidence of each square's detection (0 for the filled squares).
+    centers = get_box_centers(boxes).reshape(-1, 1, 2)
+    points = cv2.perspectiveTransform(centers, homography).reshape(-1, 2)
+    cols = np.floor(points[:, 0]).astype(np.int64)
+    rows = np.floor(points[:, 1]).astype(np.int64)
+    on_board = np.flatnonzero((cols >= 0) & (cols < 8) & (rows >= 0) & (rows < 8))
+
+    # Keep the most confident detection when several land on the same square
+    by_confidence = on_board[np.argsort(-np.asarray(confidences)[on_board], kind='stable')]
+    squares = rows[by_confidence] * 8 + cols[by_confidence]
+    squares, first = np.unique(squares, return_index=True)
+
+    board_status = np.array(previous_board_status, dtype=np.uint8).ravel()
+    board_status[squares] = np.asarray(classes, dtype=np.uint8)[by_confidence[first]]
+    square_confidences = np.zeros(64, dtype=np.float32)
+    square_confidences[squares] = np.asarray(confidences)[by_confidence[first]]
+    return board_status.reshape(8, 8), 64 - len(squares), square_confidences.reshape(8, 8)
+
+def get_status_changes(previous_board_status, new_board_status):
+    # Lists (square, change) for every changed square, from rank 8 down and file a to h
+    previous = np.asarray(previous_board_status).ravel()
+    new = np.asarray(new_board_status).ravel()
+
+    # XOR of the two statuses is non-zero exactly on the changed squares
+    changes = []
+    for index in np.flatnonzero(previous ^ new).tolist():
+        row, col = divmod(index, 8)
+        square = chess.square(col, 7 - row)
+        if new[index] == EMPTY:
+            changes.append((square, START))
+        elif previous[index] == EMPTY:
+            changes.append((square, END))
+        else:
+            changes.append((square, CAPTURE))
+    return changes
+
+class StatusFilter:
+    """Votes each square over the last `window` board statuses, so a square misread in one frame never reaches the game.
+
+    A new status is only returned once every square's value holds at least `min_votes` of the window,
+    until then the last returned status stands (hysteresis). min_votes should be more than half the window.
+    """
+
+    def __init__(self, window=3, min_votes=2):
+        self.statuses = deque(maxlen=window)
+        self.min_votes = min_votes
+        self.status = None  # Last status returned by update
+        self.confidence = None  # Share of the window that voted for each square of that status
+
+    def update(self, board_status):
+        # Returns the filtered status when it changed, otherwise None
+        self.statuses.append(np.asarray(board_status, dtype=np.uint8))
+        stack = np.stack(self.statuses)
+
+        # Status codes are 0, 1 and 2, so the index of the most voted value is its code
+        votes = np.stack([(stack == code).sum(axis=0) for code in (EMPTY, WHITE, BLACK)])
+        if (votes.max(axis=0) < self.min_votes).any():
+            return None
+
+        status = votes.argmax(axis=0).astype(np.uint8)
+        if self.status is not None and np.array_equal(status, self.status):
+            return None
+        self.status = status
+        self.confidence = votes.max(axis=0) / len(stack)
+        return status
+
+    def reset(self):
+        # Forgets the window and the last returned status, for a new game or an undone move.
+        # The board in front of the camera is then returned again even if it didn't change
+        self.statuses.clear()
+        self.status = None
+        self.confidence = None
+
+    def is_pending(self):
+        # True while the window still holds readings that disagree with the filtered status
+        return self.status is None or any((board_status != self.status).any() for board_status in self.statuses)
+
+class BoardDetector:
+    """Turns frames into board statuses.
+
+    YOLO detections are placed on the cached board grid, and while the grid is valid the square
+    classifier answers without YOLO. predict(frame, conf) must return what model.predict returns.
+    """
+
+    def __init__(self, predict, class_names, conf_threshold=conf_floor, use_fast_path=True, max_missing_after_fit=4):
+        self.predict = predict
+        self.class_names = class_names
+        self.conf_threshold = conf_threshold
+        self.use_fast_path = use_fast_path
+        self.max_missing_after_fit = max_missing_after_fit
+        self.geometry = BoardGeometry()
+        self.classifier = SquareClassifier()
+
+    def detect(self, frame, previous_board_status):
+        # Returns (board status or None, info) where info has a 'summary', a 'warning', the number of
+        # 'missing' squares filled from previous_board_status, the per square 'confidences' (None when
+        # the square classifier answered) and the YOLO 'plot' if it ran
+        info = {'summary': '', 'warning': '', 'missing': 0, 'confidences': None, 'plot': None}
+
+        # Fast path: classify the squares of the cached board grid directly, YOLO is only
+        # needed to (re)acquire the board, to recalibrate, or when a square is uncertain
+        self.geometry.check_motion(frame)
+        if self.use_fast_path and self.geometry.is_valid() and not self.classifier.needs_yolo():
+            board_status, uncertain_squares = self.classifier.classify(frame, self.geometry.homography)
+            if uncertain_squares == 0:
+                info['summary'] = f"Square classifier | {self.geometry.summary()}"
+                return board_status, info
+
+        # One inference at a low threshold, the boxes that are used are picked afterwards
+        results = self.predict(frame, self.conf_threshold)
+        boxes_no = len(results[0].boxes.xyxy) if results else 0
+
+        # Ensuring that there are detections
+        if boxes_no == 0:
+            info['warning'] = 'No results!'
+            return None, info
+
+        # Get New board status [white, black, empty]
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        confidences = results[0].boxes.conf.cpu().numpy()
+        predicted_classes = results[0].boxes.cls.cpu().numpy()
+        predicted_codes = get_status_codes(predicted_classes, self.class_names)
+        board_boxes = select_board_boxes(boxes, confidences)
+
+        # The board grid is fitted from the 64 most confident boxes that don't overlap and reused
+        # until the camera moves, meanwhile frames with missing or extra boxes are still usable
+        fitted = False
+        if not self.geometry.is_valid():
+            if len(board_boxes) < 64 or not self.geometry.fit(boxes[board_boxes], frame):
+                info['summary'] = f'number of detected boxes {len(board_boxes)}, while at least 64 are needed | {self.geometry.summary()}'
+                return None, info
+            fitted = True
+
+        # Every box is placed on its square and each square keeps its most confident box
+        board_status, missing_cells, square_confidences = locate_detections(boxes, predicted_codes, confidences, self.geometry.homography, previous_board_status)
+        if fitted and missing_cells > self.max_missing_after_fit:
+            # The boxes didn't form a board, fit again on the next frame
+            self.geometry.stale = True
+            info['summary'] = f'the detected boxes leave {missing_cells} squares empty, fitting the board again | {self.geometry.summary()}'
+            return None, info
+
+        info['summary'] = f"Detected boxes: {boxes_no} | Missing cells: {missing_cells} | {self.geometry.summary()}"
+        info['missing'] = missing_cells
+        info['confidences'] = square_confidences
+        info['plot'] = results[0][board_boxes].plot()
+
+        # Clean detections teach the square classifier what this board looks like
+        if self.use_fast_path and missing_cells == 0:
+            self.classifier.calibrate(frame, self.geometry.homography, board_status)
+        return board_status, info
+
+def display_board_status(board_status):
+    # RGB image of the board status for st.image: one color per square, scaled up without smoothing.
+    # Returns a read-only image shared by every caller
+    board_status = np.asarray(board_status, dtype=np.uint8)
+    key = board_status.tobytes()
+    with status_image_lock:
+        image = status_image_cache.get(key)
+        if image is not None:
+            status_image_cache.move_to_end(key)
+            return image
 
-    return fig
+    size = 8 * status_square_size
+    image = cv2.resize(status_colors[board_status], (size, size), interpolation=cv2.INTER_NEAREST)
+    image.flags.writeable = False
+    with status_image_lock:
+        status_image_cache[key] = image
+        while len(status_image_cache) > status_image_cache_size:
+            status_image_cache.popitem(last=False)
+    return image
@@ -0,0 +1,390 @@
+import importlib.util
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from camera_functions import FrameGrabber
+from frame_processing_functions import weight_path
+
+# 'auto' times every runtime that is installed and keeps the fastest one,
+# or set 'pytorch', 'onnx' or 'openvino' to force one
+inference_backend = 'auto'
+quantize_int8 = False  # Dynamic INT8 quantization of the ONNX export
+
+# Models are kept at module level so they survive Streamlit reruns and are shared
+# by every page and session running in this process.
+# Key: (weight_path, device, backend) -> {'model', 'load_time', 'warmup_time', 'hits', 'loaded_at'}
+loaded_models = {}
+models_lock = threading.Lock()
+model_hits = 0
+model_misses = 0
+
+# Ultralytics predictors keep per-call state (arguments, dataset, batch), so a model shared by
+# sessions, pages and the detection service must only run one predict at a time. See locked_predict
+predict_locks = weakref.WeakKeyDictionary()
+predict_locks_lock = threading.Lock()
+
+# (weight_path, device) -> backend picked by select_backend
+selected_backends = {}
+selection_lock = threading.Lock()
+
+warmup_image_size = 640
+backend_timing_runs = 5
+
+
+def get_available_backends():
+    backends = ['pytorch']
+    if importlib.util.find_spec('onnxruntime'):
+        backends.append('onnx')
+    if importlib.util.find_spec('openvino'):
+        backends.append('openvino')
+    return backends
+
+
+def export_to(path, export_format, export_path):
+    # Exports in a temporary folder next to the weights, then moves the export into place. Pool workers
+    # that start together never load a half-written export nor write the same file at once
+    temp_dir = tempfile.mkdtemp(dir=os.path.dirname(path) or '.')
+    try:
+        temp_weights = os.path.join(temp_dir, os.path.basename(path))
+        shutil.copy(path, temp_weights)
+        # A dynamic batch size, the detection service sends batches of several frames
+        exported = YOLO(temp_weights).export(format=export_format, dynamic=True)
+        try:
+            os.replace(exported, export_path)
+        except OSError:
+            # A folder can't replace another one, keep the export that another process moved in first
+            if not os.path.exists(export_path):
+                raise
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def export_model(path, backend, int8=quantize_int8):
+    # Exports the .pt weights once, the exported model is saved next to them and reused afterwards.
+    # The names differ from the static batch 1 exports of earlier versions, which can't run batches
+    if backend == 'pytorch':
+        return path
+
+    base_path = os.path.splitext(path)[0]
+    if backend == 'onnx':
+        onnx_path = base_path + '_dynamic.onnx'
+        if not os.path.exists(onnx_path):
+            export_to(path, 'onnx', onnx_path)
+        if not int8:
+            return onnx_path
+
+        int8_path = base_path + '_dynamic_int8.onnx'
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            temp_path = f"{int8_path}.{os.getpid()}.tmp"
+            quantize_dynamic(onnx_path, temp_path, weight_type=QuantType.QUInt8)
+            os.replace(temp_path, int8_path)
+        return int8_path
+
+    if backend == 'openvino':
+        openvino_path = base_path + '_dynamic_openvino_model'
+        if not os.path.exists(openvino_path):
+            export_to(path, 'openvino', openvino_path)
+        return openvino_path
+
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def locked_predict(model, source, **kwargs):
+    # model.predict, one call at a time per model
+    with predict_locks_lock:
+        lock = predict_locks.setdefault(model, threading.Lock())
+    with lock:
+        return model.predict(source=source, **kwargs)
+
+
+def select_backend(path=weight_path, device=None):
+    # GPUs stay on PyTorch, on CPU every installed runtime is timed once per process and the fastest is kept
+    if device not in (None, 'cpu'):
+        return 'pytorch'
+
+    with selection_lock:
+        if (path, device) in selected_backends:
+            return selected_backends[(path, device)]
+
+        timings = {}
+        blank_frame = np.zeros((warmup_image_size, warmup_image_size, 3), dtype=np.uint8)
+        for backend in get_available_backends():
+            try:
+                model = load_model(path, device, backend=backend)
+                start = time.perf_counter()
+                for _ in range(backend_timing_runs):
+                    locked_predict(model, blank_frame, device=device, verbose=False)
+                timings[backend] = (time.perf_counter() - start) / backend_timing_runs
+            except Exception as e:
+                print(f"Inference backend {backend} is not usable: {e}")
+
+        fastest = min(timings, key=timings.get)
+        print(f"Inference backend timings: {timings}, using {fastest}")
+        for backend in timings:
+            if backend != fastest:
+                evict_model(path, device, backend)
+
+        selected_backends[(path, device)] = fastest
+        return fastest
+
+
+def resolve_backend(path=weight_path, device=None, backend=inference_backend):
+    # The backend 'auto' stands for, so a process pool can pick it once and pass it to its workers
+    return select_backend(path, device) if backend == 'auto' else backend
+
+
+def load_model(path=weight_path, device=None, warmup=True, backend=inference_backend):
+    global model_hits, model_misses
+    backend = resolve_backend(path, device, backend)
+    key = (path, device, backend)
+
+    with models_lock:
+        entry = loaded_models.get(key)
+        if entry:
+            entry['hits'] += 1
+            model_hits += 1
+            return entry['model']
+
+        model_misses += 1
+        start = time.perf_counter()
+        model = YOLO(export_model(path, backend), task='detect')
+        if device and backend == 'pytorch':
+            model.to(device)
+        load_time = time.perf_counter() - start
+
+        # Run one dummy inference so the first real frame doesn't pay for the lazy predictor setup
+        warmup_time = 0.0
+        if warmup:
+            start = time.perf_counter()
+            blank_frame = np.zeros((warmup_image_size, warmup_image_size, 3), dtype=np.uint8)
+            locked_predict(model, blank_frame, device=device, verbose=False)
+            warmup_time = time.perf_counter() - start
+
+        loaded_models[key] = {
+            'model': model,
+            'load_time': load_time,
+            'warmup_time': warmup_time,
+            'hits': 0,
+            'loaded_at': time.time(),
+        }
+        return model
+
+
+def evict_model(path=None, device=None, backend=None):
+    # Evicts the matching models, or every loaded model when no path is given
+    with models_lock:
+        if path is None:
+            evicted = len(loaded_models)
+            loaded_models.clear()
+            return evicted
+
+        keys = [key for key in loaded_models if key[:2] == (path, device) and backend in (None, key[2])]
+        for key in keys:
+            del loaded_models[key]
+        return len(keys)
+
+
+def get_model_stats():
+    with models_lock:
+        requests = model_hits + model_misses
+        return {
+            'loaded': len(loaded_models),
+            'hits': model_hits,
+            'misses': model_misses,
+            'hit_rate': model_hits / requests if requests else 0.0,
+            'models': {
+                f"{path} ({device or 'default'}, {backend})": {
+                    'load_time': entry['load_time'],
+                    'warmup_time': entry['warmup_time'],
+                    'hits': entry['hits'],
+                    'loaded_at': entry['loaded_at'],
+                }
+                for (path, device, backend), entry in loaded_models.items()
+            },
+        }
+
+
+# Set in each worker process of a process pool by init_worker_model, so the model is loaded once per process
+worker_model = None
+
+
+def init_worker_model(path=weight_path, device=None, backend=inference_backend):
+    # backend should be resolved by the parent with resolve_backend, or every worker times every runtime
+    global worker_model
+    # Workers already run in parallel, OpenCV threads inside each one only compete for the same cores
+    cv2.setNumThreads(1)
+    worker_model = load_model(path, device, backend=backend)
+
+
+def get_worker_model():
+    return worker_model if worker_model is not None else load_model()
+
+
+detection_timeout = 10  # Seconds a caller waits for its detection before giving up
+
+
+class DetectionService:
+    """Runs detection for several boards with one batched predict call.
+
+    Frames from any number of sessions or cameras are queued and grouped into micro-batches of
+    up to max_batch_size frames. A batch is sent as soon as it is full or the oldest frame in it
+    has waited max_latency seconds. Each caller gets a future with the same list of Results that
+    model.predict returns for a single frame, filtered to its own confidence threshold.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_latency=0.05):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.requests = queue.Queue()
+        self.running = False
+        self.thread = None
+        self.cameras = []
+        self.stats_lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.inference_time = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        for grabber, _ in self.cameras:
+            grabber.stop()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        self._fail_queued()
+
+    def submit(self, frame, conf):
+        future = Future()
+        self.requests.put((time.perf_counter(), frame, conf, future))
+        # A stopped service takes no more frames
+        if not self.running:
+            self._fail_queued()
+        return future
+
+    def _fail_queued(self):
+        # Requests left in the queue would never be answered, their callers get an error instead
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            if request[3].set_running_or_notify_cancel():
+                request[3].set_exception(RuntimeError("The detection service was stopped"))
+
+    def _collect_batch(self):
+        try:
+            first = self.requests.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = first[0] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._collect_batch()
+            batch = [request for request in batch if request[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            # One predict at the lowest threshold in the batch, each board then keeps its own boxes.
+            # Any error fails the whole batch, the thread must keep running for the other sessions
+            start = time.perf_counter()
+            try:
+                results = locked_predict(
+                    self.model,
+                    [frame for _, frame, _, _ in batch],
+                    conf=min(conf for _, _, conf, _ in batch),
+                    verbose=False,
+                )
+                filtered = [[result[result.boxes.conf >= conf]] for (_, _, conf, _), result in zip(batch, results)]
+                if len(filtered) != len(batch):
+                    raise RuntimeError(f"{len(filtered)} results for a batch of {len(batch)} frames")
+            except Exception as e:
+                for request in batch:
+                    request[3].set_exception(e)
+                continue
+
+            for (_, _, _, future), result in zip(batch, filtered):
+                future.set_result(result)
+
+            with self.stats_lock:
+                self.batches += 1
+                self.frames += len(batch)
+                self.inference_time += time.perf_counter() - start
+
+    def attach_camera(self, source, on_result, conf=0.7, fps=3):
+        # Feeds the newest frame of a camera to the service and passes each result to on_result(frame, results)
+        grabber = FrameGrabber(source)
+        if not grabber.start():
+            raise RuntimeError(f"Unable to access camera {source}")
+
+        def feed():
+            while grabber.running:
+                frame = grabber.read()
+                if frame is None:
+                    continue
+                # A failed or late detection only loses this frame, the camera keeps being served
+                try:
+                    on_result(frame, self.submit(frame, conf).result(timeout=detection_timeout))
+                except Exception as e:
+                    print(f"Detection for camera {source} failed: {e!r}")
+                time.sleep(1 / fps)
+
+        self.cameras.append((grabber, threading.Thread(target=feed, daemon=True)))
+        self.cameras[-1][1].start()
+        return grabber
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                'batches': self.batches,
+                'frames': self.frames,
+                'avg_batch_size': self.frames / self.batches if self.batches else 0.0,
+                'avg_batch_time': self.inference_time / self.batches if self.batches else 0.0,
+                'queued': self.requests.qsize(),
+            }
+
+
+# (weight_path, device) -> running DetectionService shared by every session
+detection_services = {}
+services_lock = threading.Lock()
+
+
+def get_detection_service(path=weight_path, device=None):
+    with services_lock:
+        service = detection_services.get((path, device))
+        # A service whose thread died would leave every caller waiting, start a new one
+        if service is None or not service.is_alive():
+            service = DetectionService(load_model(path, device))
+            service.start()
+            detection_services[(path, device)] = service
+        return service
@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+
+import chess
+
+from batch_functions import batch_conf_threshold, detect_folder
+from process_video import write_pgn
+
+
+def get_fens(records, replay_game=False, board=None):
+    # FEN per image. Photos of one game are replayed so pieces keep their identity,
+    # otherwise each status is read on its own with status_to_board
+    from chess_functions import GameTracker, status_to_board
+    tracker = GameTracker(board) if replay_game else None
+    fens = []
+    for name, record in records:
+        if record['status'] is None:
+            fens.append(None)
+        elif tracker:
+            for event in tracker.feed(record['status']):
+                if event['type'] in ('warning', 'illegal'):
+                    print(f"{name}: {event['message']}")
+            fens.append(tracker.board.fen())
+        else:
+            fens.append(status_to_board(record['status']).board_fen())
+    if tracker:
+        tracker.collect_evaluations(wait=True)
+    return fens, tracker
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Detect the board in every image of a folder")
+    parser.add_argument('folder', help="Folder with the images")
+    parser.add_argument('--output', help="Folder for the results, defaults to <folder>/detections")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes running detection")
+    parser.add_argument('--conf', type=float, default=batch_conf_threshold, help="Lowest box score kept, the 64 most confident boxes that don't overlap are used")
+    parser.add_argument('--game', action='store_true', help="The images are the successive positions of one game")
+    parser.add_argument('--fen', help="Starting position of the game if it isn't the initial one")
+    args = parser.parse_args()
+
+    output_dir = args.output or os.path.join(args.folder, 'detections')
+    records = detect_folder(args.folder, output_dir, workers=args.workers, conf=args.conf)
+    fens, tracker = get_fens(records, args.game, chess.Board(args.fen) if args.fen else None)
+
+    results = [dict(record, image=name, fen=fen) for (name, record), fen in zip(records, fens)]
+    with open(os.path.join(output_dir, 'results.json'), 'w') as results_file:
+        json.dump(results, results_file, indent=1)
+    if tracker:
+        write_pgn(tracker, os.path.join(output_dir, 'game.pgn'), os.path.normpath(args.folder))
+
+    missing = sum(record['status'] is None for _, record in records)
+    print(f"Wrote {len(results)} results to {output_dir}, {missing} images without all 64 squares")
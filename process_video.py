@@ -0,0 +1,45 @@
+import argparse
+import os
+
+import chess
+
+from video_functions import detect_video, video_stride
+
+
+def reconstruct_game(statuses, board=None):
+    # Replays the stable board states through a GameTracker, waits for every evaluation.
+    # Imported here so the worker processes don't each start a Stockfish pool
+    from chess_functions import GameTracker
+    tracker = GameTracker(board)
+    for frame_index, board_status in statuses:
+        for event in tracker.feed(board_status):
+            if event['type'] in ('warning', 'illegal'):
+                print(f"Frame {frame_index}: {event['message']}")
+            elif event['type'] == 'game_over':
+                print(event['message'])
+    tracker.collect_evaluations(wait=True)
+    return tracker
+
+
+def write_pgn(tracker, output_path, video_path):
+    # Each move gets its evaluation as a comment
+    from export_functions import export_to_pgn
+    with open(output_path, 'w') as pgn_file:
+        pgn_file.write(export_to_pgn(tracker.moves, tracker.start_board, {"Event": os.path.basename(video_path)}))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reconstruct a chess game from a recorded video")
+    parser.add_argument('video', help="Path of the video file")
+    parser.add_argument('--output', help="PGN file to write, defaults to the video name with .pgn")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes decoding chunks of the video")
+    parser.add_argument('--stride', type=int, default=video_stride, help="Check every n-th frame")
+    parser.add_argument('--fen', help="Starting position if the game doesn't start from the initial one")
+    args = parser.parse_args()
+
+    statuses = detect_video(args.video, workers=args.workers, stride=args.stride)
+    tracker = reconstruct_game(statuses, chess.Board(args.fen) if args.fen else None)
+
+    output_path = args.output or os.path.splitext(args.video)[0] + '.pgn'
+    write_pgn(tracker, output_path, args.video)
+    print(f"Wrote {len(tracker.board.move_stack)} plies to {output_path}")
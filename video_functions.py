@@ -0,0 +1,124 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from camera_functions import MotionGate
+from frame_processing_functions import *
+from model_functions import export_model, get_worker_model, init_worker_model, locked_predict, resolve_backend
+
+video_stride = 5  # Only every n-th frame is decoded and checked
+video_min_chunk_frames = 1500  # Shortest chunk worth a worker of its own
+
+def get_video_info(video_path):
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Unable to open video {video_path}")
+    info = {
+        'frames': int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'fps': capture.get(cv2.CAP_PROP_FPS) or 30.0,
+    }
+    capture.release()
+    return info
+
+
+def iter_video_frames(video_path, start_frame=0, end_frame=None, stride=video_stride):
+    # Yields (frame index, frame) for every stride-th frame in [start_frame, end_frame)
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Unable to open video {video_path}")
+    if start_frame:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    frame_index = start_frame
+    try:
+        while end_frame is None or frame_index < end_frame:
+            # grab() skips a frame without converting it, only the frames we keep are retrieved
+            if not capture.grab():
+                break
+            if (frame_index - start_frame) % stride == 0:
+                ret, frame = capture.retrieve()
+                if not ret:
+                    break
+                yield frame_index, frame
+            frame_index += 1
+    finally:
+        capture.release()
+
+
+def plan_chunks(frame_count, workers, min_chunk_frames=video_min_chunk_frames):
+    # Splits the video in up to `workers` chunks of at least min_chunk_frames frames, as (start, end) pairs.
+    # The frame count is only the container's estimate (0 or -1 when it has none), so the last chunk
+    # has no end and reads until the video does
+    if frame_count <= 0:
+        return [(0, None)]
+    chunks = max(1, min(workers, frame_count // min_chunk_frames))
+    bounds = np.linspace(0, frame_count, chunks + 1).astype(int).tolist()
+    return list(zip(bounds[:-1], bounds[1:-1] + [None]))
+
+
+def detect_chunk(video_path, start_frame, end_frame, stride=video_stride):
+    # Returns [(frame index, board status)] for every stable board state of the chunk, without consecutive duplicates.
+    # A chunk doesn't know the board before it, so it starts with the first frame where all 64 squares were detected
+    model = get_worker_model()
+    detector = BoardDetector(lambda frame, conf: locked_predict(model, frame, conf=conf, verbose=False), model.names)
+    # Video time isn't wall time, so only the board content decides when to detect
+    gate = MotionGate(min_interval=0, refresh_interval=float('inf'))
+
+    # Single misread frames are voted out before they become a board state
+    status_filter = StatusFilter()
+    statuses = []
+    for frame_index, frame in iter_video_frames(video_path, start_frame, end_frame, stride):
+        geometry = detector.geometry
+        # Until the board grid is fitted every frame may be needed to find a good threshold,
+        # and still frames are detected again until the status filter agrees on every square
+        if not gate.should_infer(frame, geometry.homography if geometry.is_valid() else None,
+                                 force=not geometry.is_valid(), recheck=status_filter.is_pending()):
+            continue
+
+        previous_board_status = statuses[-1][1] if statuses else np.zeros((8, 8), dtype=np.uint8)
+        board_status, info = detector.detect(frame, previous_board_status)
+        if board_status is None or gate.stable_count < gate.stable_frames:
+            continue
+        if not statuses and info['missing']:
+            continue
+        board_status = status_filter.update(board_status)
+        if board_status is not None:
+            statuses.append((frame_index, board_status))
+    return statuses
+
+
+def stitch_chunks(chunk_statuses):
+    # Joins the chunks in order. A board state that spans a chunk boundary is found by both chunks and kept once
+    statuses = []
+    for chunk in chunk_statuses:
+        for frame_index, board_status in chunk:
+            if statuses and np.array_equal(board_status, statuses[-1][1]):
+                continue
+            statuses.append((frame_index, board_status))
+    return statuses
+
+
+def detect_video(video_path, workers=os.cpu_count(), stride=video_stride, path=weight_path, device=None):
+    # Decodes and detects the chunks in parallel processes, returns the stitched stable board states
+    start = time.perf_counter()
+    video_info = get_video_info(video_path)
+    chunks = plan_chunks(video_info['frames'], workers)
+
+    # The runtime is picked and exported once here, the workers only load it
+    backend = resolve_backend(path, device)
+    export_model(path, backend)
+    if len(chunks) == 1:
+        init_worker_model(path, device, backend)
+        chunk_statuses = [detect_chunk(video_path, *chunks[0], stride)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks), initializer=init_worker_model, initargs=(path, device, backend)) as executor:
+            chunk_statuses = list(executor.map(detect_chunk, *zip(*[(video_path, s, e, stride) for s, e in chunks])))
+
+    statuses = stitch_chunks(chunk_statuses)
+    elapsed = time.perf_counter() - start
+    print(f"Detected {len(statuses)} board states in {video_info['frames'] / video_info['fps']:.0f}s of video "
+          f"with {len(chunks)} chunks in {elapsed:.1f}s")
+    return statuses